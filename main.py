@@ -1,11 +1,23 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, constr
+from typing import List, Optional
+import asyncio
+import json
 import logging
 
-from anime_rec_engine.recommender import RECOMMENDER
+from anime_rec_engine.concurrency import ConcurrencyLimiter, OverloadedError
+from anime_rec_engine.config import config
+from anime_rec_engine.data_models import AnimeFilters
+from anime_rec_engine.recommender import RECOMMENDER, readiness, request_deadline, warmup
+from anime_rec_engine.telemetry import CACHE_ENTRIES, CACHE_LOOKUPS, LIMITER_REQUESTS, REGISTRY, REQUEST_SECONDS, REQUESTS, end_trace, start_trace
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.info(f"Application modules imported in {(time.perf_counter() - _import_started) * 1000:.0f} ms.")
 
 app = FastAPI(
     title="AI Anime Recommendation API",
@@ -13,31 +25,235 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Bounds in-flight recommendations per worker; excess requests get a 429
+LIMITER = ConcurrencyLimiter(
+    max_concurrency=config.max_concurrent_requests,
+    max_waiting=config.max_waiting_requests,
+)
+
+WARMUP_STATE = {"done": False, "error": None, "timings": {}}
+
+if config.telemetry_enabled:
+    @app.middleware("http")
+    async def trace_requests(request: Request, call_next):
+        """
+        Times each request, collects its stage spans and reports them as
+        metrics and in the `Server-Timing` and `X-Request-ID` headers.
+        """
+        trace, token = start_trace(request.headers.get("x-request-id"))
+        status = "500"
+        try:
+            response = await call_next(request)
+            status = str(response.status_code)
+        finally:
+            end_trace(token)
+            elapsed = time.perf_counter() - trace.started
+            # The route template keeps label cardinality bounded, e.g. for /recommend/similar/{anime_id}
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(elapsed, request.method, route, status)
+            REQUESTS.inc(request.method, route, status)
+            if trace.spans:
+                logging.debug(f"Request {trace.request_id} {request.method} {route} {status}: {trace.server_timing(elapsed)}")
+        response.headers["Server-Timing"] = trace.server_timing(elapsed)
+        response.headers["X-Request-ID"] = trace.request_id
+        return response
+
+async def run_warmup():
+    try:
+        WARMUP_STATE["timings"] = await asyncio.get_running_loop().run_in_executor(None, warmup)
+        WARMUP_STATE["done"] = True
+    except Exception as e:
+        WARMUP_STATE["error"] = str(e)
+        logging.error(f"Warmup failed: {e}", exc_info=True)
+
+@app.on_event("startup")
+async def startup():
+    # Warm up in the background so the process accepts health checks immediately
+    if config.warmup_on_startup:
+        asyncio.create_task(run_warmup())
+
+@app.on_event("shutdown")
+async def shutdown():
+    if RECOMMENDER.initialized:
+        await RECOMMENDER.aclose()
+
 class RecommendationQuery(BaseModel):
     """Pydantic model for the recommendation request body."""
-    query: str = Field(..., min_length=3, description="The user's query describing the kind of anime they want to watch.")
+    query: str = Field(..., min_length=3, max_length=config.max_query_chars, description="The user's query describing the kind of anime they want to watch.")
     n_results: int = Field(10, gt=0, le=20, description="The number of similar animes to retrieve for generating the recommendation.")
+    filters: Optional[AnimeFilters] = Field(None, description="Structured filters on type, rating, members and genre.")
+
+class BatchRecommendationQuery(BaseModel):
+    """Pydantic model for the batch recommendation request body."""
+    queries: List[constr(min_length=3, max_length=config.max_query_chars)] = Field(..., min_length=1, max_length=config.batch_max_queries, description="The user queries to answer, each describing the kind of anime wanted.")
+    n_results: int = Field(10, gt=0, le=20, description="The number of similar animes to retrieve for each query.")
+    filters: Optional[AnimeFilters] = Field(None, description="Structured filters applied to every query.")
 
 @app.post("/recommend/", tags=["Recommendations"])
-def get_anime_recommendation(request: RecommendationQuery):
+async def get_anime_recommendation(request: RecommendationQuery):
     """
     Accepts a user query and returns an AI-generated anime recommendation.
     """
+    # Taken before the limiter, so time spent queueing for a slot counts against the deadline
+    deadline = request_deadline()
     try:
         logging.info(f"Received recommendation request for query: '{request.query}'")
-        recommendation = RECOMMENDER.get_recommendation(
-            query=request.query,
-            n_results=request.n_results
-        )
+        async with LIMITER.slot(deadline):
+            recommendation = await RECOMMENDER.aget_recommendation(
+                query=request.query,
+                n_results=request.n_results,
+                filters=request.filters,
+                deadline=deadline,
+            )
         if not recommendation or not recommendation.get("llm_response"):
              raise HTTPException(status_code=404, detail="Could not find a suitable recommendation based on your query.")
         
         return recommendation
-        
+
+    except OverloadedError:
+        raise HTTPException(status_code=429, detail="The server is busy. Please retry shortly.", headers={"Retry-After": "1"})
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="An internal server error occurred.")
+
+@app.post("/recommend/batch", tags=["Recommendations"])
+async def get_anime_recommendations_batch(request: BatchRecommendationQuery):
+    """
+    Accepts many user queries and returns one recommendation per query, in input order.
+
+    Each result carries its own `status`, so a failed item does not fail the batch.
+    """
+    deadline = request_deadline()
+    try:
+        logging.info(f"Received batch recommendation request with {len(request.queries)} queries.")
+        # The batch takes a limiter slot per stage and per LLM call itself, so it shares the per-worker budget
+        results = await RECOMMENDER.aget_recommendations_batch(
+            queries=request.queries,
+            n_results=request.n_results,
+            filters=request.filters,
+            deadline=deadline,
+            limiter=LIMITER,
+        )
+        return {"results": results}
+
+    except OverloadedError:
+        raise HTTPException(status_code=429, detail="The server is busy. Please retry shortly.", headers={"Retry-After": "1"})
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="An internal server error occurred.")
+
+@app.get("/recommend/similar/{anime_id}", tags=["Recommendations"])
+async def get_similar_animes(
+    anime_id: int,
+    n_results: int = Query(10, gt=0, le=config.neighbor_k, description="The number of similar animes to return."),
+    narrate: bool = Query(False, description="Whether to add an AI-generated recommendation paragraph."),
+):
+    """
+    Returns animes similar to the given anime from the precomputed neighbour table.
+
+    Without `narrate` the answer needs no model inference at all.
+    """
+    deadline = request_deadline()
+    try:
+        if narrate:
+            async with LIMITER.slot(deadline):
+                result = await RECOMMENDER.amore_like_this(anime_id, n_results=n_results, narrate=True, deadline=deadline)
+        else:
+            result = await RECOMMENDER.amore_like_this(anime_id, n_results=n_results)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"No neighbours found for anime {anime_id}.")
+        return result
+
+    except OverloadedError:
+        raise HTTPException(status_code=429, detail="The server is busy. Please retry shortly.", headers={"Retry-After": "1"})
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"An unexpected error occurred: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An internal server error occurred.")
 
+class LimitedStreamingResponse(StreamingResponse):
+    """
+    Streaming response that holds a limiter slot until it has been sent.
+
+    The slot is released when the ASGI call ends, however it ends, so a client
+    that disconnects before the body iterator starts cannot leak it.
+    """
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            LIMITER.release()
+
+@app.post("/recommend/stream", tags=["Recommendations"])
+async def stream_anime_recommendation(request: RecommendationQuery):
+    """
+    Streams an AI-generated anime recommendation as server-sent events.
+
+    The retrieved source animes are sent first as a `source_animes` event,
+    followed by `token` events as the LLM produces text and a final `done` event.
+    """
+    logging.info(f"Received streaming recommendation request for query: '{request.query}'")
+    deadline = request_deadline()
+    try:
+        await LIMITER.acquire(deadline)
+    except OverloadedError:
+        raise HTTPException(status_code=429, detail="The server is busy. Please retry shortly.", headers={"Retry-After": "1"})
+
+    async def event_stream():
+        try:
+            async for event in RECOMMENDER.astream_recommendation(
+                query=request.query, n_results=request.n_results, filters=request.filters, deadline=deadline
+            ):
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        except Exception as e:
+            logging.error(f"An unexpected error occurred while streaming: {e}", exc_info=True)
+            yield f"event: error\ndata: {json.dumps('An internal server error occurred.')}\n\n"
+
+    try:
+        return LimitedStreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except BaseException:
+        LIMITER.release()
+        raise
+
+@app.get("/ready", tags=["Health Check"])
+def read_readiness():
+    """
+    Readiness check: 200 once every serving component is initialized, 503 before that.
+    """
+    components = readiness()
+    ready = all(components.values())
+    body = {
+        "status": "ready" if ready else "starting",
+        "components": components,
+        "init_seconds": WARMUP_STATE["timings"],
+        "error": WARMUP_STATE["error"],
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
+@app.get("/metrics", tags=["Health Check"])
+def read_metrics():
+    """
+    Prometheus metrics of this worker process: stage and request latency histograms and counters,
+    embedding micro-batch sizes and queue waits, prompt sizes and cache hit rates.
+    """
+    if not config.telemetry_enabled:
+        raise HTTPException(status_code=404, detail="Telemetry is disabled.")
+    LIMITER_REQUESTS.set(LIMITER.in_flight, "running")
+    LIMITER_REQUESTS.set(LIMITER.waiting, "waiting")
+    if RECOMMENDER.initialized:
+        for cache, stats in RECOMMENDER.cache_stats().items():
+            CACHE_LOOKUPS.set(stats["hits"], cache, "hit")
+            CACHE_LOOKUPS.set(stats["misses"], cache, "miss")
+            CACHE_ENTRIES.set(stats["size"], cache)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/", tags=["Health Check"])
 def read_root():
     """A simple health check endpoint."""
@@ -0,0 +1,158 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .telemetry import EMBEDDING_BATCH_SIZE, EMBEDDING_QUEUE_WAIT
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching scheduler for single-text embedding requests.
+
+    Callers submit one text at a time from any thread. A background thread
+    gathers texts that arrive within `max_wait_ms` of the first one (or until
+    `max_batch_size` texts are queued) into a single encode call and hands
+    each caller its own row of the result. Batch size and queue wait are
+    tracked, and exported as histograms on `/metrics`, so the
+    throughput/latency tradeoff can be tuned.
+    """
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], max_batch_size: int = 32, max_wait_ms: float = 3.0):
+        """
+        Initializes the MicroBatcher.
+
+        Args:
+            encode_fn (Callable[[List[str]], np.ndarray]): Encodes a list of texts into a matrix.
+            max_batch_size (int): The maximum number of texts encoded together.
+            max_wait_ms (float): How long the first text of a batch may wait for others to join.
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.batches = 0
+        self.items = 0
+        self.max_observed_batch = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+        self.batch_size_histogram: Dict[int, int] = {}
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-microbatcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queues a text for encoding.
+
+        Args:
+            text (str): The text to encode.
+
+        Returns:
+            Future: Resolves to the text's embedding vector.
+        """
+        future = Future()
+        self._ensure_started()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def encode(self, text: str) -> np.ndarray:
+        """
+        Encodes a single text through the scheduler, blocking until its batch is done.
+        """
+        return self.submit(text).result()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._process(batch)
+            if stop:
+                return
+
+    def _process(self, batch: List[tuple]):
+        started = time.perf_counter()
+        waits = [started - enqueued_at for _, _, enqueued_at in batch]
+        try:
+            vectors = self.encode_fn([text for text, _, _ in batch])
+            for (_, future, _), vector in zip(batch, vectors):
+                future.set_result(vector)
+        except Exception as e:
+            logger.error(f"Micro-batched encode of {len(batch)} texts failed. Error: {e}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+
+        EMBEDDING_BATCH_SIZE.observe(len(batch))
+        for wait in waits:
+            EMBEDDING_QUEUE_WAIT.observe(wait)
+        bucket = 1 << (len(batch) - 1).bit_length()
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.max_observed_batch = max(self.max_observed_batch, len(batch))
+            self.total_wait += sum(waits)
+            self.max_observed_wait = max(self.max_observed_wait, max(waits))
+            self.batch_size_histogram[bucket] = self.batch_size_histogram.get(bucket, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns batch size and queue wait metrics collected since start or the last reset.
+
+        The histogram is keyed by the power-of-two upper bound of each batch size.
+        """
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_observed_batch,
+                "mean_queue_wait_ms": 1000.0 * self.total_wait / self.items if self.items else 0.0,
+                "max_queue_wait_ms": 1000.0 * self.max_observed_wait,
+                "batch_size_histogram": dict(sorted(self.batch_size_histogram.items())),
+            }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._reset_counters()
+
+    def close(self):
+        """
+        Stops the background thread after the already-queued texts are encoded.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
@@ -0,0 +1,211 @@
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+class FakeGroqServer:
+    """
+    Local stand-in for the Groq chat completions API.
+
+    Serves the OpenAI-compatible endpoint the Groq SDK calls, both plain and
+    streamed, with a configurable time to first token and token rate, so
+    serving benchmarks measure our own overhead instead of a remote service.
+    Point the app at it with `GROQ_BASE_URL=<server.base_url>`.
+    """
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 200.0,
+        jitter_ms: float = 0.0,
+        tokens_per_second: float = 500.0,
+        completion_tokens: int = 150,
+    ):
+        """
+        Initializes the server without starting it.
+
+        Args:
+            host (str): The interface to bind.
+            port (int): The port to bind; 0 picks a free port.
+            latency_ms (float): Delay before the first token.
+            jitter_ms (float): Maximum uniform random delay added to `latency_ms`.
+            tokens_per_second (float): The rate tokens are generated at after the first one.
+            completion_tokens (int): The number of tokens in every completion.
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _first_token_delay(self) -> float:
+        return (self.latency_ms + random.uniform(0.0, self.jitter_ms)) / 1000.0
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.rstrip("/") != COMPLETIONS_PATH:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+                    return
+                try:
+                    request = json.loads(body or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": {"message": "Invalid JSON body.", "type": "invalid_request_error"}})
+                    return
+                with server._lock:
+                    server.requests += 1
+
+                model = request.get("model", "fake-model")
+                prompt_tokens = sum(len(str(message.get("content", ""))) // 4 for message in request.get("messages", []))
+                completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+                created = int(time.time())
+                time.sleep(server._first_token_delay())
+
+                if request.get("stream"):
+                    self._stream(completion_id, created, model)
+                    return
+
+                time.sleep(server._token_delay() * max(0, server.completion_tokens - 1))
+                self._send_json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": " ".join(["token"] * server.completion_tokens)},
+                        "finish_reason": "stop",
+                        "logprobs": None,
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": server.completion_tokens,
+                        "total_tokens": prompt_tokens + server.completion_tokens,
+                    },
+                })
+
+            def _stream(self, completion_id: str, created: int, model: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+
+                def event(delta: dict, finish_reason: Optional[str] = None):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason, "logprobs": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                try:
+                    event({"role": "assistant", "content": ""})
+                    for i in range(server.completion_tokens):
+                        if i:
+                            time.sleep(server._token_delay())
+                        event({"content": "token" if i == 0 else " token"})
+                    event({}, finish_reason="stop")
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading, e.g. on cancellation
+                    pass
+                self.close_connection = True
+
+        return Handler
+
+    def start(self) -> "FakeGroqServer":
+        """
+        Serves requests on a background thread.
+        """
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-groq", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Fake Groq server listening on {self.base_url} "
+            f"(latency {self.latency_ms} ms, {self.tokens_per_second} tokens/s, {self.completion_tokens} tokens)."
+        )
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "FakeGroqServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local Groq-compatible chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Time to first token.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Maximum random delay added to the latency.")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0, help="Token generation rate.")
+    parser.add_argument("--completion-tokens", type=int, default=150, help="Tokens per completion.")
+    args = parser.parse_args()
+
+    server = FakeGroqServer(
+        host=args.host,
+        port=args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+    )
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,277 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List
+
+import numpy as np
+
+from anime_rec_engine.benchmark.fake_groq import FakeGroqServer
+from anime_rec_engine.benchmark.synthetic import generate_queries, write_catalog
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    """
+    Summarizes latency samples in milliseconds.
+    """
+    if not seconds:
+        return {"count": 0}
+    ms = np.asarray(seconds) * 1000.0
+    return {
+        "count": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+def benchmark_environment(workdir: str, groq_base_url: str, use_caches: bool) -> Dict[str, str]:
+    """
+    Returns the environment variables that point every artifact at `workdir` and the LLM at the fake server.
+
+    Caches are disabled unless `use_caches` is set, so repeated queries measure the full path.
+    """
+    env = {
+        "GROQ_API_KEY": "benchmark",
+        "GROQ_BASE_URL": groq_base_url,
+        "CHROMA_DB_PATH": os.path.join(workdir, "chroma_db"),
+        "NUMPY_INDEX_PATH": os.path.join(workdir, "numpy_index", "anime_index.bin"),
+        "CATALOG_PATH": os.path.join(workdir, "catalog.bin"),
+        "NEIGHBOR_TABLE_PATH": os.path.join(workdir, "neighbor_table.npz"),
+        "QUANTIZED_INDEX_DIR": os.path.join(workdir, "quantized_index"),
+        "INDEX_MANIFEST_PATH": os.path.join(workdir, "index_manifest.json"),
+        "INGEST_CHECKPOINT_PATH": os.path.join(workdir, "ingest_checkpoint.json"),
+        "REJECT_REPORT_PATH": "",
+        "EMBEDDING_CACHE_DIR": "",
+        "LLM_CACHE_PATH": "",
+    }
+    if not use_caches:
+        env.update({"QUERY_CACHE_SIZE": "0", "RETRIEVAL_CACHE_SIZE": "0", "LLM_CACHE_SIZE": "0"})
+    return env
+
+def run_ingest(data_filepath: str, batch_size: int, build_neighbors: bool) -> Dict[str, Any]:
+    """
+    Times a full, non-resumed training pipeline run.
+    """
+    from anime_rec_engine.pipeline import run_training_pipeline
+
+    started = time.perf_counter()
+    stats = run_training_pipeline(data_filepath, batch_size=batch_size, build_neighbors=build_neighbors, resume=False)
+    wall_seconds = time.perf_counter() - started
+    rows = stats.get("added", 0) + stats.get("updated", 0) + stats.get("unchanged", 0)
+    return {
+        "rows": rows,
+        "rejected": stats.get("rejected", 0),
+        "wall_seconds": round(wall_seconds, 3),
+        "rows_per_second": round(rows / wall_seconds, 1) if wall_seconds else 0.0,
+        "stages": stats.get("stages", {}),
+    }
+
+def run_stages(queries: List[str], n_results: int) -> Dict[str, Any]:
+    """
+    Times each stage of a recommendation in-process, one query at a time.
+    """
+    from anime_rec_engine.llm_models import embedding_model, groq_model
+    from anime_rec_engine.prompts import PROMPT_TEMPLATE
+    from anime_rec_engine.recommender import RECOMMENDER
+
+    samples: Dict[str, List[float]] = {"embed": [], "search": [], "prompt": [], "llm": [], "total": []}
+    prompt_tokens = []
+    for query in queries:
+        started = time.perf_counter()
+        query_embedding = embedding_model.create_embeddings([query])
+        embedded = time.perf_counter()
+        similar_animes = RECOMMENDER._search(query_embedding, n_results=n_results, filters=None)[0]
+        searched = time.perf_counter()
+        built = PROMPT_TEMPLATE.build_prompt(query=query, context=similar_animes)
+        prompted = time.perf_counter()
+        groq_model.get_recommendation(prompt=built.text)
+        finished = time.perf_counter()
+
+        samples["embed"].append(embedded - started)
+        samples["search"].append(searched - embedded)
+        samples["prompt"].append(prompted - searched)
+        samples["llm"].append(finished - prompted)
+        samples["total"].append(finished - started)
+        prompt_tokens.append(built.prompt_tokens)
+
+    result = {stage: latency_summary(values) for stage, values in samples.items()}
+    result["prompt_tokens_mean"] = round(float(np.mean(prompt_tokens)), 1) if prompt_tokens else 0.0
+    return result
+
+def _wait_ready(base_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/ready", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"API at {base_url} was not ready after {timeout:.0f} seconds.")
+
+async def _load(base_url: str, queries: List[str], total_requests: int, concurrency: int, n_results: int) -> Dict[str, Any]:
+    import httpx
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_request = iter(range(total_requests))
+
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        timeout=120.0,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    ) as client:
+        async def worker():
+            for i in next_request:
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/recommend/", json={"query": queries[i % len(queries)], "n_results": n_results})
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                elapsed = time.perf_counter() - started
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == "200":
+                    latencies.append(elapsed)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall_seconds = time.perf_counter() - started
+
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(len(latencies) / wall_seconds, 1) if wall_seconds else 0.0,
+        "statuses": statuses,
+        "latency": latency_summary(latencies),
+    }
+
+def run_serving(
+    queries: List[str],
+    env: Dict[str, str],
+    app_dir: str,
+    port: int,
+    total_requests: int,
+    concurrency: int,
+    n_results: int,
+    ready_timeout: float,
+) -> Dict[str, Any]:
+    """
+    Starts the API with uvicorn in a subprocess and measures `/recommend/` latency under concurrent load.
+    """
+    base_url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", app_dir, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **env, "WARMUP_ON_STARTUP": "true"},
+    )
+    try:
+        _wait_ready(base_url, ready_timeout)
+        return asyncio.run(_load(base_url, queries, total_requests, concurrency, n_results))
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline ingestion and serving benchmarks.")
+    parser.add_argument("--rows", type=int, default=10_000, help="Size of the synthetic catalog (10k to 1M).")
+    parser.add_argument("--scenarios", default="ingest,stages,serving", help="Comma-separated scenarios to run.")
+    parser.add_argument("--workdir", default="./benchmark_data", help="Directory for the catalog CSV and all index artifacts.")
+    parser.add_argument("--output", default="./benchmark_results.json", help="Path of the JSON results file.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic catalog and queries.")
+    parser.add_argument("--batch-size", type=int, default=256, help="Ingestion batch size.")
+    parser.add_argument("--no-neighbors", action="store_true", help="Skip the neighbour table, which is quadratic in catalog size.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of distinct synthetic queries.")
+    parser.add_argument("--n-results", type=int, default=10, help="Context animes retrieved per query.")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests sent in the serving scenario.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients in the serving scenario.")
+    parser.add_argument("--port", type=int, default=8800, help="Port of the API under test.")
+    parser.add_argument("--app-dir", default=".", help="Directory containing the API's main.py.")
+    parser.add_argument("--ready-timeout", type=float, default=300.0, help="Seconds to wait for the API to become ready.")
+    parser.add_argument("--use-caches", action="store_true", help="Keep the query, retrieval and LLM caches enabled.")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Fake LLM time to first token.")
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0, help="Fake LLM latency jitter.")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=500.0, help="Fake LLM token rate.")
+    parser.add_argument("--llm-completion-tokens", type=int, default=150, help="Fake LLM completion length.")
+    args = parser.parse_args()
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+
+    workdir = os.path.abspath(args.workdir)
+    os.makedirs(workdir, exist_ok=True)
+    data_filepath = os.path.join(workdir, f"anime_synthetic_{args.rows}.csv")
+    if not os.path.exists(data_filepath):
+        write_catalog(data_filepath, args.rows, seed=args.seed)
+    queries = generate_queries(args.queries, seed=args.seed + 1)
+
+    with FakeGroqServer(
+        latency_ms=args.llm_latency_ms,
+        jitter_ms=args.llm_jitter_ms,
+        tokens_per_second=args.llm_tokens_per_second,
+        completion_tokens=args.llm_completion_tokens,
+    ) as fake_groq:
+        # Must happen before the first import of anime_rec_engine.config
+        env = benchmark_environment(workdir, fake_groq.base_url, args.use_caches)
+        os.environ.update(env)
+        from anime_rec_engine.config import config
+
+        results: Dict[str, Any] = {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "parameters": {
+                **vars(args),
+                "embedding_model": config.embedding_model_name,
+                "embedding_backend": config.embedding_backend,
+                "vector_store_backend": config.vector_store_backend,
+                "prompt_token_budget": config.prompt_token_budget,
+                "quantized_search": config.quantized_search,
+            },
+            "scenarios": {},
+        }
+
+        if "ingest" in scenarios:
+            logger.info(f"Benchmarking ingestion of {args.rows} rows...")
+            results["scenarios"]["ingest"] = run_ingest(data_filepath, args.batch_size, not args.no_neighbors)
+        if "stages" in scenarios:
+            logger.info(f"Benchmarking per-stage latency over {len(queries)} queries...")
+            results["scenarios"]["stages"] = run_stages(queries, args.n_results)
+        if "serving" in scenarios:
+            logger.info(f"Benchmarking /recommend/ with {args.requests} requests at concurrency {args.concurrency}...")
+            results["scenarios"]["serving"] = run_serving(
+                queries,
+                env,
+                os.path.abspath(args.app_dir),
+                args.port,
+                args.requests,
+                args.concurrency,
+                args.n_results,
+                args.ready_timeout,
+            )
+        results["fake_llm_requests"] = fake_groq.requests
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Benchmark results written to '{args.output}'.")
+    print(json.dumps(results["scenarios"], indent=2))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded LRU cache with an optional time-to-live.
+
+    Entries beyond `maxsize` are evicted least-recently-used first, and entries
+    older than `ttl` seconds are treated as misses. Hit and miss counters are
+    kept so the cache can be tuned from its stats.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        Initializes the LRUCache.
+
+        Args:
+            maxsize (int): The maximum number of entries. 0 disables the cache.
+            ttl (Optional[float]): Entry lifetime in seconds. None keeps entries until evicted.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is in flight block until it finishes and receive the same result (or the
+    same exception) instead of starting their own call.
+    """
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+class AsyncSingleFlight:
+    """
+    Asyncio counterpart of `SingleFlight`.
+
+    The shared call runs as its own task, so a caller that is cancelled (for
+    example because its client disconnected) does not cancel the call for the
+    other callers waiting on it.
+    """
+    def __init__(self):
+        self._tasks: Dict[Hashable, "asyncio.Task"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from .data_models import Anime
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# File layout: magic | uint64 table-of-contents length | JSON table of contents | 8-byte aligned arrays
+_MAGIC = b"ANICAT01"
+_TOC_LENGTH = struct.Struct("<Q")
+_ALIGNMENT = 8
+
+class StringTable:
+    """
+    Interned, offset-encoded string table.
+
+    Every distinct string is stored once as UTF-8 in a single byte blob, and
+    string `i` is `blob[offsets[i]:offsets[i + 1]]`. Columns refer to strings
+    by their int32 index.
+    """
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return bytes(self.blob[self.offsets[index]:self.offsets[index + 1]]).decode("utf-8")
+
+    @classmethod
+    def build(cls, strings: List[str]) -> "StringTable":
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(data) for data in encoded], dtype=np.int64)
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8) if encoded else np.empty(0, dtype=np.uint8)
+        return cls(blob, offsets)
+
+class Catalog:
+    """
+    Compact, columnar catalog of anime metadata.
+
+    Numeric fields are NumPy arrays, and names, types and genres are indices
+    into a shared interned string table, with genres stored as a CSR list per
+    row. Rows are sorted by `anime_id`, so a lookup is a binary search. The
+    catalog is written to a single file that is memory-mapped on load, so all
+    workers on a host share one copy of its pages.
+    """
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        """
+        Initializes the Catalog from its column arrays.
+
+        Args:
+            columns (Dict[str, np.ndarray]): The arrays written by `build_catalog` or read by `load`.
+        """
+        self.columns = columns
+        self.ids = columns["ids"]
+        self.ratings = columns["ratings"]
+        self.members = columns["members"]
+        self.episodes = columns["episodes"]
+        self.names = columns["names"]
+        self.types = columns["types"]
+        self.genre_offsets = columns["genre_offsets"]
+        self.genre_values = columns["genre_values"]
+        self.strings = StringTable(columns["string_blob"], columns["string_offsets"])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows_of(self, anime_ids: Iterable[int]) -> np.ndarray:
+        """
+        Returns the row of each anime id, or -1 for ids not in the catalog.
+        """
+        anime_ids = np.asarray(list(anime_ids), dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(len(anime_ids), -1, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.ids, anime_ids), len(self.ids) - 1)
+        return np.where(self.ids[rows] == anime_ids, rows, -1)
+
+    def genres(self, row: int) -> List[str]:
+        values = self.genre_values[self.genre_offsets[row]:self.genre_offsets[row + 1]]
+        return [self.strings[value] for value in values]
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        """
+        Returns the metadata of a row in the same flat format the vector stores return.
+        """
+        return {
+            "anime_id": int(self.ids[row]),
+            "name": self.strings[self.names[row]],
+            "genre": ", ".join(self.genres(row)),
+            "type": self.strings[self.types[row]],
+            "episodes": int(self.episodes[row]),
+            "rating": float(self.ratings[row]),
+            "members": int(self.members[row]),
+        }
+
+    def metadatas(self, anime_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """
+        Returns the metadata of the given animes in order, skipping ids missing from the catalog.
+        """
+        return [self.metadata(row) for row in self.rows_of(anime_ids) if row >= 0]
+
+    def save(self, path: str):
+        """
+        Atomically writes the catalog to a single binary file.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        toc, offset = {}, 0
+        for name, array in self.columns.items():
+            toc[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+        toc_bytes = json.dumps(toc).encode("utf-8")
+        toc_bytes += b" " * (-(len(_MAGIC) + _TOC_LENGTH.size + len(toc_bytes)) % _ALIGNMENT)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(_TOC_LENGTH.pack(len(toc_bytes)))
+            f.write(toc_bytes)
+            for array in self.columns.values():
+                data = np.ascontiguousarray(array).tobytes()
+                f.write(data)
+                f.write(b"\0" * (-len(data) % _ALIGNMENT))
+        os.replace(tmp_path, path)
+        logger.info(f"Catalog of {len(self)} animes and {len(self.strings)} strings saved to '{path}'.")
+
+    @classmethod
+    def load(cls, path: str) -> "Catalog":
+        """
+        Memory-maps a catalog written by `save`.
+        """
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(buffer[:len(_MAGIC)]) != _MAGIC:
+            raise ValueError(f"'{path}' is not an anime catalog file.")
+        (toc_length,) = _TOC_LENGTH.unpack(bytes(buffer[len(_MAGIC):len(_MAGIC) + _TOC_LENGTH.size]))
+        data_start = len(_MAGIC) + _TOC_LENGTH.size + toc_length
+        toc = json.loads(bytes(buffer[len(_MAGIC) + _TOC_LENGTH.size:data_start]).decode("utf-8"))
+
+        columns = {}
+        for name, entry in toc.items():
+            dtype = np.dtype(entry["dtype"])
+            count = int(np.prod(entry["shape"]))
+            start = data_start + entry["offset"]
+            columns[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(entry["shape"])
+        catalog = cls(columns)
+        logger.info(f"Catalog of {len(catalog)} animes memory-mapped from '{path}'.")
+        return catalog
+
+def build_catalog(records: Iterable[Union[Anime, Dict[str, Any]]]) -> Catalog:
+    """
+    Builds a catalog from `Anime` models or vector store metadata dicts.
+
+    Args:
+        records (Iterable[Union[Anime, Dict[str, Any]]]): The animes to include. Later duplicates of an `anime_id` win.
+
+    Returns:
+        Catalog: The catalog, with rows sorted by `anime_id`.
+    """
+    by_id: Dict[int, Dict[str, Any]] = {}
+    for record in records:
+        data = record.dict() if isinstance(record, Anime) else dict(record)
+        if isinstance(data.get("genre"), str):
+            data["genre"] = [genre.strip() for genre in data["genre"].split(",") if genre.strip()]
+        by_id[int(data["anime_id"])] = data
+    ordered = [by_id[anime_id] for anime_id in sorted(by_id)]
+
+    interned: Dict[str, int] = {}
+    def intern(string: Optional[str]) -> int:
+        return interned.setdefault(string or "", len(interned))
+
+    names = np.array([intern(data.get("name")) for data in ordered], dtype=np.int32)
+    types = np.array([intern(data.get("type")) for data in ordered], dtype=np.int32)
+    genre_lists = [[intern(genre) for genre in data.get("genre") or []] for data in ordered]
+    genre_offsets = np.zeros(len(ordered) + 1, dtype=np.int64)
+    genre_offsets[1:] = np.cumsum([len(genres) for genres in genre_lists], dtype=np.int64)
+    genre_values = np.array([value for genres in genre_lists for value in genres], dtype=np.int32)
+    strings = StringTable.build(list(interned))
+
+    return Catalog({
+        "ids": np.array([data["anime_id"] for data in ordered], dtype=np.int64),
+        # float64 keeps ratings identical to the source values when read back
+        "ratings": np.array([data.get("rating", 0.0) for data in ordered], dtype=np.float64),
+        "members": np.array([data.get("members", 0) for data in ordered], dtype=np.int64),
+        "episodes": np.array([data.get("episodes", 0) for data in ordered], dtype=np.int32),
+        "names": names,
+        "types": types,
+        "genre_offsets": genre_offsets,
+        "genre_values": genre_values,
+        "string_blob": strings.blob,
+        "string_offsets": strings.offsets,
+    })
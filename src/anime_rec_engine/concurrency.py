@@ -0,0 +1,69 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+class OverloadedError(Exception):
+    """
+    Raised when a request is rejected because the service is saturated.
+    """
+
+class ConcurrencyLimiter:
+    """
+    Caps the number of requests processed concurrently and applies backpressure.
+
+    Up to `max_concurrency` requests run at once and up to `max_waiting` more
+    may queue for a slot. Anything beyond that is rejected immediately with
+    `OverloadedError` instead of piling up unbounded latency.
+    """
+    def __init__(self, max_concurrency: int, max_waiting: int = 0):
+        """
+        Initializes the ConcurrencyLimiter.
+
+        Args:
+            max_concurrency (int): Maximum number of requests running at the same time.
+            max_waiting (int): Maximum number of requests allowed to wait for a slot.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def acquire(self, deadline: Optional[float] = None):
+        """
+        Waits for a free slot, or raises `OverloadedError` if the wait queue is full.
+
+        Args:
+            deadline (Optional[float]): `time.monotonic()` time after which waiting is given up
+                with `OverloadedError`. None waits as long as it takes.
+        """
+        if self.in_flight >= self.max_concurrency and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise OverloadedError("Too many concurrent requests.")
+
+        self.waiting += 1
+        try:
+            if deadline is None:
+                await self._semaphore.acquire()
+            else:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise OverloadedError("No slot freed up before the request's deadline.")
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[float] = None):
+        await self.acquire(deadline)
+        try:
+            yield
+        finally:
+            self.release()
@@ -24,12 +24,109 @@ class AppConfig:
         # Application Settings with sensible defaults
         self.embedding_model_name = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
         self.llm_model_name = os.getenv("LLM_MODEL_NAME", "llama3-8b-8192")
+        self.groq_base_url = os.getenv("GROQ_BASE_URL", "")  # Empty uses the Groq API; set to point at a compatible server
+
+        # Embedding inference backend: "torch", "onnx" or "int8", optionally loaded from a local path
+        self.embedding_backend = os.getenv("EMBEDDING_BACKEND", "torch")
+        self.embedding_model_path = os.getenv("EMBEDDING_MODEL_PATH", "")
+        self.embedding_onnx_file = os.getenv("EMBEDDING_ONNX_FILE", "")  # e.g. onnx/model_qint8_avx512.onnx
+
+        # Embedding throughput settings
+        self.embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        self.embedding_num_workers = int(os.getenv("EMBEDDING_NUM_WORKERS", "0"))  # 0 disables the multi-process pool
+
+        # Shared embedding server: when set, workers send encodes to this Unix socket instead of loading the model
+        self.embedding_server_socket = os.getenv("EMBEDDING_SERVER_SOCKET", "")
+        self.embedding_server_timeout = float(os.getenv("EMBEDDING_SERVER_TIMEOUT", "30"))
+
+        self.embedding_cache_dir = os.getenv("EMBEDDING_CACHE_DIR", "./embedding_cache")  # Empty disables the cache
+
+        # Vector store backend: "chroma" or the in-process "numpy" index
+        self.vector_store_backend = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+        self.chroma_db_path = os.getenv("CHROMA_DB_PATH", "./chroma_db")
+        self.numpy_index_path = os.getenv("NUMPY_INDEX_PATH", "./numpy_index/anime_index.bin")
+        self.numpy_index_mmap = os.getenv("NUMPY_INDEX_MMAP", "true").lower() == "true"
+
+        # Shared, memory-mapped metadata catalog
+        self.catalog_path = os.getenv("CATALOG_PATH", "./catalog.bin")
+
+        # Precomputed item-to-item neighbours
+        self.neighbor_table_path = os.getenv("NEIGHBOR_TABLE_PATH", "./neighbor_table.npz")
+        self.neighbor_k = int(os.getenv("NEIGHBOR_K", "20"))
+
+        # Quantized first-pass search: "off", "int8" or "binary", rescored exactly over a shortlist of k * factor rows
+        self.quantized_index_dir = os.getenv("QUANTIZED_INDEX_DIR", "./quantized_index")
+        self.quantized_search = os.getenv("QUANTIZED_SEARCH", "off")
+        self.quantized_rescore_factor = int(os.getenv("QUANTIZED_RESCORE_FACTOR", "10"))
+        self.quantized_recall_queries = int(os.getenv("QUANTIZED_RECALL_QUERIES", "100"))  # 0 skips the recall report after ingestion
+
+        # Streaming CSV loader
+        self.ingest_chunk_size = int(os.getenv("INGEST_CHUNK_SIZE", "5000"))
+        self.reject_report_path = os.getenv("REJECT_REPORT_PATH", "")  # Empty keeps only the reject counts
+
+        # Incremental re-indexing
+        self.index_manifest_path = os.getenv("INDEX_MANIFEST_PATH", "./chroma_db/index_manifest.json")
+
+        # Pipelined, resumable ingestion
+        self.ingest_encode_workers = int(os.getenv("INGEST_ENCODE_WORKERS", "1"))
+        self.ingest_queue_size = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+        self.ingest_checkpoint_path = os.getenv("INGEST_CHECKPOINT_PATH", "./chroma_db/ingest_checkpoint.json")
+        self.ingest_checkpoint_every = int(os.getenv("INGEST_CHECKPOINT_EVERY", "20"))  # Minimum batches between checkpoints; grows with the batches written
+
+        # Query-side caches (size 0 disables, TTL in seconds)
+        self.query_cache_size = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+        self.query_cache_ttl = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+        self.retrieval_cache_size = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+        self.retrieval_cache_ttl = float(os.getenv("RETRIEVAL_CACHE_TTL", "600"))
+
+        # LLM response cache (size 0 disables, empty path keeps it in memory only)
+        self.llm_cache_size = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+        self.llm_cache_ttl = float(os.getenv("LLM_CACHE_TTL", "3600"))
+        self.llm_cache_path = os.getenv("LLM_CACHE_PATH", "")
+
+        # Prompt packing: maximum estimated tokens of a whole prompt
+        self.prompt_token_budget = int(os.getenv("PROMPT_TOKEN_BUDGET", "700"))
+        self.max_query_chars = int(os.getenv("MAX_QUERY_CHARS", "500"))  # Longer queries are rejected by the API
+
+        # Async serving limits
+        self.max_concurrent_requests = int(os.getenv("MAX_CONCURRENT_REQUESTS", "256"))
+        self.max_waiting_requests = int(os.getenv("MAX_WAITING_REQUESTS", "256"))
+        self.blocking_executor_workers = int(os.getenv("BLOCKING_EXECUTOR_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+        self.groq_max_connections = int(os.getenv("GROQ_MAX_CONNECTIONS", "100"))
+
+        # LLM latency control: a recommendation falls back to a template answer once its deadline,
+        # counted from the request's arrival, is near
+        self.llm_deadline_seconds = float(os.getenv("LLM_DEADLINE_SECONDS", "10"))
+        self.llm_min_attempt_seconds = float(os.getenv("LLM_MIN_ATTEMPT_SECONDS", "0.5"))  # Don't start a call with less time left
+        self.llm_connect_timeout = float(os.getenv("LLM_CONNECT_TIMEOUT", "2"))
+        self.llm_read_timeout = float(os.getenv("LLM_READ_TIMEOUT", "15"))
+        self.llm_max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.llm_retry_base_delay = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.2"))
+        # Hedging sends a second identical call once the first has run longer than the recent p95
+        self.llm_hedge_enabled = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+        self.llm_hedge_percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+        self.llm_hedge_initial_delay = float(os.getenv("LLM_HEDGE_INITIAL_DELAY", "2"))  # Used until enough latencies are recorded
+
+        # Query embedding micro-batching (window 0 disables it)
+        self.embedding_batch_window_ms = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "3"))
+        self.embedding_max_batch = int(os.getenv("EMBEDDING_MAX_BATCH", "32"))
+
+        # Batch endpoint
+        self.batch_max_queries = int(os.getenv("BATCH_MAX_QUERIES", "500"))
+        self.batch_llm_concurrency = int(os.getenv("BATCH_LLM_CONCURRENCY", "16"))
+
+        # Stage timing spans, the /metrics endpoint and Server-Timing headers
+        self.telemetry_enabled = os.getenv("TELEMETRY_ENABLED", "true").lower() == "true"
+
+        # Startup
+        self.warmup_on_startup = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
 
         # --- Validation ---
-        # Ensure the most critical API key is present
+        # The LLM is only needed for serving, so a missing key fails when the Groq client is first used
         if not self.groq_api_key:
-            logger.error("FATAL: GROQ_API_KEY environment variable not set.")
-            raise ValueError("GROQ_API_KEY must be set in your .env file.")
+            logger.warning("GROQ_API_KEY environment variable not set. LLM recommendations will be unavailable.")
+        if self.quantized_search not in ("off", "int8", "binary"):
+            raise ValueError(f"Unknown QUANTIZED_SEARCH '{self.quantized_search}'. Expected 'off', 'int8' or 'binary'.")
         
         logger.info("Configuration loaded successfully.")
 
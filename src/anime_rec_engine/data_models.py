@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 
 class Anime(BaseModel):
     """
@@ -24,3 +24,31 @@ class Anime(BaseModel):
         """
         from_attributes = True
 
+
+class AnimeFilters(BaseModel):
+    """
+    Pydantic data model for structured filters applied before similarity search.
+
+    Every field is optional; an empty filter matches the whole catalog.
+    Genre filters require all of `include_genres` and none of `exclude_genres`.
+    """
+    types: Optional[List[str]] = Field(None, description="Allowed anime types (e.g., TV, Movie, OVA).")
+    min_rating: Optional[float] = Field(None, ge=0, le=10, description="Minimum average user rating.")
+    max_rating: Optional[float] = Field(None, ge=0, le=10, description="Maximum average user rating.")
+    min_members: Optional[int] = Field(None, ge=0, description="Minimum number of community members.")
+    max_members: Optional[int] = Field(None, ge=0, description="Maximum number of community members.")
+    include_genres: Optional[List[str]] = Field(None, description="Genres the anime must all have.")
+    exclude_genres: Optional[List[str]] = Field(None, description="Genres the anime must not have.")
+
+    def is_empty(self) -> bool:
+        return all(value is None or value == [] for value in self.dict().values())
+
+    def cache_key(self) -> tuple:
+        """
+        Returns a hashable, order-insensitive representation used in cache keys.
+        """
+        return tuple(
+            (name, tuple(sorted(value)) if isinstance(value, list) else value)
+            for name, value in sorted(self.dict().items())
+            if value is not None and value != []
+        )
@@ -0,0 +1,197 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: without it, only one process may write to a cache directory
+    fcntl = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def text_key(text: str) -> str:
+    """
+    Returns the content address used to cache the embedding of a text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def cache_namespace(model_name: str, backend: str = "torch", model_path: str = "") -> str:
+    """
+    Returns the cache namespace of a model, so vectors from different backends or model files never mix.
+
+    Args:
+        model_name (str): Name of the embedding model.
+        backend (str): Inference backend the vectors come from.
+        model_path (str): Local directory the model was loaded from, if any.
+    """
+    namespace = model_name if backend == "torch" else f"{model_name}@{backend}"
+    if model_path:
+        # Two local directories may hold different weights under the same model name
+        namespace += "@" + hashlib.sha256(os.path.abspath(model_path).encode("utf-8")).hexdigest()[:12]
+    return namespace
+
+class EmbeddingCache:
+    """
+    Content-addressed, on-disk cache of text embeddings for a single model.
+
+    Vectors are appended to a raw float32 file that is read back through a
+    memory map, and an append-only log maps each text hash to its row, so an
+    add costs only its new rows. Each model gets its own sub-directory so
+    vectors from different models never mix. Writers hold an exclusive file
+    lock, so the API and the training pipeline can share a cache directory;
+    rows appended by other processes are picked up on the next miss.
+    """
+    def __init__(self, cache_dir: str, model_name: str, dimension: int):
+        """
+        Initializes the EmbeddingCache, loading any vectors persisted by earlier runs.
+
+        Args:
+            cache_dir (str): Root directory of the cache.
+            model_name (str): Name of the embedding model the vectors belong to.
+            dimension (int): Embedding dimension of the model.
+        """
+        self.model_name = model_name
+        self.dimension = dimension
+        self.directory = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.index_path = os.path.join(self.directory, "index.log")
+        self.lock_path = os.path.join(self.directory, "cache.lock")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.index: Dict[str, int] = {}
+        self._index_offset = 0
+        self._vectors = None
+        self._mapped_rows = 0
+        with self._file_lock():
+            self._migrate_json_index()
+            self._read_log()
+        logger.info(f"Embedding cache for '{model_name}' ready with {len(self.index)} vectors.")
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        # Serializes writers across processes; readers never take it
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _migrate_json_index(self):
+        # Caches written before the log format kept a JSON index
+        json_path = os.path.join(self.directory, "index.json")
+        if not os.path.exists(json_path):
+            return
+        if not os.path.exists(self.index_path):
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+                with open(self.index_path, "w", encoding="utf-8") as f:
+                    f.write("".join(f"{key} {row}\n" for key, row in entries.items()))
+            except Exception as e:
+                logger.warning(f"Could not migrate embedding cache index at '{json_path}', starting empty. Error: {e}")
+        os.remove(json_path)
+
+    def _read_log(self):
+        # Reads entries appended since the last call; a line still being written is left for the next one
+        if not os.path.exists(self.index_path) or os.path.getsize(self.index_path) <= self._index_offset:
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].decode("utf-8", errors="replace").splitlines():
+            key, _, row = line.partition(" ")
+            if row.isdigit():
+                self.index[key] = int(row)
+        self._index_offset += end
+
+    def _map_vectors(self):
+        rows = os.path.getsize(self.vectors_path) // (4 * self.dimension) if os.path.exists(self.vectors_path) else 0
+        if rows != self._mapped_rows:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimension)) if rows else None
+            self._mapped_rows = rows
+
+    def get_many(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Looks up cached vectors for the given texts.
+
+        Args:
+            texts (List[str]): The texts to look up.
+
+        Returns:
+            Dict[str, np.ndarray]: The cached vector of each text that was found.
+        """
+        found = {}
+        with self._lock:
+            keys = [text_key(text) for text in texts]
+            if any(key not in self.index for key in keys):
+                self._read_log()
+            for text, key in zip(texts, keys):
+                row = self.index.get(key)
+                if row is not None and row >= self._mapped_rows:
+                    self._map_vectors()
+                if row is None or row >= self._mapped_rows:
+                    # Entries past the end of the vector file (e.g. after a crash) count as misses
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    found[text] = self._vectors[row]
+        return found
+
+    def add(self, texts: List[str], vectors: np.ndarray):
+        """
+        Appends new vectors to the cache and their entries to the index log.
+
+        Args:
+            texts (List[str]): The texts the vectors were computed from.
+            vectors (np.ndarray): A float32 matrix with one row per text.
+        """
+        with self._lock, self._file_lock():
+            self._read_log()
+            new_rows = {}
+            for i, text in enumerate(texts):
+                key = text_key(text)
+                if key not in self.index:
+                    new_rows.setdefault(key, i)
+            if not new_rows:
+                return
+            block = np.ascontiguousarray(vectors[list(new_rows.values())], dtype=np.float32)
+            row_bytes = 4 * self.dimension
+            # Vectors are written before the index so the index never references missing rows
+            with open(self.vectors_path, "ab") as f:
+                size = f.seek(0, os.SEEK_END)
+                if size % row_bytes:
+                    # A crash mid-write left a partial row; drop it so rows stay aligned
+                    size = f.truncate(size - size % row_bytes)
+                start = size // row_bytes
+                f.write(block.tobytes())
+            with open(self.index_path, "ab") as f:
+                f.truncate(self._index_offset)  # Drops a line torn by a crash; every complete line was read above
+                f.seek(0, os.SEEK_END)
+                f.write("".join(f"{key} {start + offset}\n" for offset, key in enumerate(new_rows)).encode("utf-8"))
+                self._index_offset = f.tell()
+            for offset, key in enumerate(new_rows):
+                self.index[key] = start + offset
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
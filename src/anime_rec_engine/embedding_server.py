@@ -0,0 +1,300 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from .batching import MicroBatcher
+from .config import config
+from .embedding_cache import EmbeddingCache, cache_namespace
+from .llm_models import EmbeddingModel
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Request: op | payload length, then the payload (a JSON list of texts for OP_ENCODE)
+_REQUEST = struct.Struct("<BI")
+# Response: status | rows | dim | payload length, then float32 rows, an info JSON or an error message
+_RESPONSE = struct.Struct("<BIIQ")
+OP_INFO = 0
+OP_ENCODE = 1
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+def _recv_exact(sock: socket.socket, size: int) -> bytearray:
+    # A bytearray keeps the vectors decoded from it writable
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Embedding server connection closed.")
+        data.extend(chunk)
+    return data
+
+class EmbeddingServer:
+    """
+    Serves one embedding model to every API worker on the host over a Unix socket.
+
+    Each connection is handled on its own thread. Texts from small requests
+    of all connections go through one `MicroBatcher`, so concurrent queries
+    from different workers share encode calls; requests larger than a batch
+    (e.g. ingestion) are encoded directly, one at a time.
+    """
+    def __init__(
+        self,
+        model: EmbeddingModel,
+        socket_path: str = config.embedding_server_socket,
+        max_batch_size: int = config.embedding_max_batch,
+        max_wait_ms: float = config.embedding_batch_window_ms,
+    ):
+        """
+        Initializes the EmbeddingServer without starting it.
+
+        Args:
+            model (EmbeddingModel): The loaded model that serves all encodes.
+            socket_path (str): Filesystem path of the Unix socket.
+            max_batch_size (int): The maximum number of texts encoded together across clients.
+            max_wait_ms (float): How long the first queued text may wait for others to join its batch.
+        """
+        self.model = model
+        self.socket_path = socket_path
+        self.max_batch_size = max_batch_size
+        self.batcher = MicroBatcher(
+            encode_fn=lambda texts: model.create_embeddings(texts),
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+        )
+        # Large encodes already fill the cores, so running two at once only adds contention
+        self._large_encode_lock = threading.Lock()
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def info(self) -> dict:
+        return {
+            "model_name": self.model.model_name,
+            "backend": self.model.backend,
+            # Absolute, so clients in other directories derive the same cache namespace
+            "model_path": os.path.abspath(self.model.model_path) if self.model.model_path else "",
+            "dimension": self.model.dimension,
+        }
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.model.dimension), dtype=np.float32)
+        if len(texts) > self.max_batch_size:
+            with self._large_encode_lock:
+                return self.model.create_embeddings(texts)
+        futures = [self.batcher.submit(text) for text in texts]
+        return np.stack([future.result() for future in futures]).astype(np.float32, copy=False)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        op, length = _REQUEST.unpack(_recv_exact(self.request, _REQUEST.size))
+                        payload = _recv_exact(self.request, length)
+                    except ConnectionError:
+                        return
+                    try:
+                        if op == OP_INFO:
+                            body = json.dumps(server.info()).encode("utf-8")
+                            header = _RESPONSE.pack(STATUS_OK, 0, server.model.dimension, len(body))
+                        elif op == OP_ENCODE:
+                            vectors = server.encode(json.loads(payload.decode("utf-8")))
+                            body = np.ascontiguousarray(vectors, dtype=np.float32).tobytes()
+                            header = _RESPONSE.pack(STATUS_OK, vectors.shape[0], vectors.shape[1], len(body))
+                        else:
+                            raise ValueError(f"Unknown embedding server op {op}.")
+                    except Exception as e:
+                        logger.error(f"Embedding request failed. Error: {e}")
+                        body = str(e).encode("utf-8")
+                        header = _RESPONSE.pack(STATUS_ERROR, 0, 0, len(body))
+                    try:
+                        self.request.sendall(header + body)
+                    except OSError:
+                        return
+
+        return Handler
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        probe.settimeout(1.0)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            # Nobody is listening, so the file is left over from a server that died
+            os.unlink(self.socket_path)
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"An embedding server is already listening on '{self.socket_path}'.")
+
+    def serve_forever(self):
+        """
+        Binds the socket, replacing a stale one, and serves until `shutdown` is called.
+
+        Raises:
+            RuntimeError: If another server is already listening on the socket path.
+        """
+        self._remove_stale_socket()
+        directory = os.path.dirname(self.socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Owner and group only, from the moment the socket exists
+        old_umask = os.umask(0o117)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, self._handler_class())
+        finally:
+            os.umask(old_umask)
+        os.chmod(self.socket_path, 0o660)
+        self._server.daemon_threads = True
+        logger.info(f"Embedding server for '{self.model.model_name}' listening on '{self.socket_path}'.")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            self.batcher.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+class RemoteEmbeddingModel(EmbeddingModel):
+    """
+    Thin `EmbeddingModel` client of a local `EmbeddingServer`.
+
+    It loads no model, so API workers stay small and start fast. Dedup and the
+    persistent embedding cache work as in `EmbeddingModel`; only the encode
+    itself is sent to the server. Each thread keeps its own connection.
+    Large encodes (ingestion) are sent as sub-batches of at most
+    `max_request_texts`, each with a timeout that grows with its size.
+    """
+    def __init__(
+        self,
+        socket_path: str = config.embedding_server_socket,
+        cache_dir: str = config.embedding_cache_dir,
+        timeout: float = config.embedding_server_timeout,
+        max_request_texts: int = 512,
+    ):
+        """
+        Connects to the embedding server and reads the served model's details.
+
+        Args:
+            socket_path (str): Filesystem path of the server's Unix socket.
+            cache_dir (str): Directory of the persistent embedding cache. Empty disables it.
+            timeout (float): Socket timeout in seconds per `config.embedding_batch_size` texts of a request.
+            max_request_texts (int): The most texts sent in one request; larger encodes are split.
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.max_request_texts = max_request_texts
+        self.model = None
+        self.pool = None
+        self._local = threading.local()
+        try:
+            info = json.loads(self._request(OP_INFO, b"")[1])
+        except Exception as e:
+            logger.error(f"Failed to reach the embedding server at '{socket_path}'. Error: {e}")
+            raise
+        self.model_name = info["model_name"]
+        self.backend = info["backend"]
+        self.model_path = info.get("model_path", "")
+        self.dimension = info["dimension"]
+        namespace = cache_namespace(self.model_name, self.backend, self.model_path)
+        self.cache = EmbeddingCache(cache_dir, namespace, self.dimension) if cache_dir else None
+        logger.info(f"Using embedding server at '{socket_path}' ({self.model_name}, backend: {self.backend}).")
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _close_connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _request(self, op: int, payload: bytes, timeout: Optional[float] = None) -> tuple:
+        # One reconnect covers a server restart between requests
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.settimeout(timeout or self.timeout)
+                sock.sendall(_REQUEST.pack(op, len(payload)) + payload)
+                status, rows, dim, length = _RESPONSE.unpack(_recv_exact(sock, _RESPONSE.size))
+                body = _recv_exact(sock, length)
+                break
+            except socket.timeout:
+                # The server may still be encoding this request, so resending it would only queue a second copy.
+                # The late response would desync the connection, so it is dropped.
+                self._close_connection()
+                raise
+            except (ConnectionError, OSError):
+                self._close_connection()
+                if attempt == 1:
+                    raise
+        if status != STATUS_OK:
+            raise RuntimeError(f"Embedding server error: {body.decode('utf-8', errors='replace')}")
+        return (rows, dim), body
+
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        try:
+            parts = []
+            for start in range(0, len(texts), self.max_request_texts):
+                chunk = texts[start:start + self.max_request_texts]
+                timeout = self.timeout * max(1.0, len(chunk) / config.embedding_batch_size)
+                (rows, dim), body = self._request(OP_ENCODE, json.dumps(chunk).encode("utf-8"), timeout=timeout)
+                parts.append(np.frombuffer(body, dtype=np.float32).reshape(rows, dim))
+            return parts[0] if len(parts) == 1 else np.concatenate(parts)
+        except Exception as e:
+            logger.error(f"Failed to create batch embeddings via the embedding server. Error: {e}")
+            raise
+
+    def start_pool(self, num_workers: int = config.embedding_num_workers):
+        # The server owns the model, and any pool, for every client
+        return
+
+    def stop_pool(self):
+        return
+
+    def create_embedding(self, text: str) -> list[float]:
+        return self.create_embeddings([text])[0].tolist()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the embedding model to all API workers over a Unix socket.")
+    parser.add_argument("--socket", default=config.embedding_server_socket or "/tmp/anime_rec_embeddings.sock", help="Path of the Unix socket.")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="Intra-op threads of the PyTorch backends.")
+    args = parser.parse_args()
+
+    model = EmbeddingModel()
+    if model.backend != "onnx":
+        import torch
+        # One process owns every core instead of N workers fighting over them
+        torch.set_num_threads(args.threads)
+    model.create_embeddings(["warmup"])
+    server = EmbeddingServer(model, socket_path=args.socket)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,59 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class Lazy(Generic[T]):
+    """
+    Thread-safe proxy that builds its target on first use.
+
+    Attribute access is forwarded to the target, so a `Lazy` can stand in for
+    a module-level singleton without loading models or opening clients at
+    import time. The time spent building the target is logged and kept in
+    `init_seconds` to track startup regressions.
+    """
+    def __init__(self, factory: Callable[[], T], name: str):
+        """
+        Initializes the Lazy proxy.
+
+        Args:
+            factory (Callable[[], T]): Builds the target instance.
+            name (str): Component name used in logs and readiness reports.
+        """
+        self._factory = factory
+        self._name = name
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+        self.init_seconds: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> T:
+        """
+        Returns the target, building it on the first call.
+        """
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                started = time.perf_counter()
+                logger.info(f"Initializing {self._name}...")
+                self._instance = self._factory()
+                self.init_seconds = time.perf_counter() - started
+                logger.info(f"{self._name} initialized in {self.init_seconds * 1000:.0f} ms.")
+            return self._instance
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self.get(), attribute)
@@ -1,7 +1,16 @@
+import asyncio
 import logging
-from sentence_transformers import SentenceTransformer
-from groq import Groq
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import AsyncIterator, List, Optional
+import numpy as np
 from .config import config
+from .cache import AsyncSingleFlight, SingleFlight
+from .embedding_cache import EmbeddingCache, cache_namespace
+from .lazy import Lazy
+from .resilience import DeadlineExceeded, LatencyWindow, is_retryable, retry_delay
+from .response_cache import ResponseCache, response_key
+from .telemetry import LLM_EVENTS
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -13,21 +22,129 @@ class EmbeddingModel:
     This class handles loading the embedding model and provides a simple
     interface to convert text (anime synopses) into vector embeddings.
     """
-    def __init__(self, model_name: str = config.embedding_model_name):
+    def __init__(
+        self,
+        model_name: str = config.embedding_model_name,
+        cache_dir: str = config.embedding_cache_dir,
+        backend: str = config.embedding_backend,
+        model_path: str = config.embedding_model_path,
+    ):
         """
         Initializes the EmbeddingModel.
 
         Args:
             model_name (str): The name of the SentenceTransformer model to use.
+            cache_dir (str): Directory of the persistent embedding cache. Empty disables it.
+            backend (str): Inference backend: "torch", "onnx" (an exported ONNX model) or
+                "int8" (PyTorch with dynamic int8 quantization of the linear layers).
+            model_path (str): Local directory to load the model from instead of `model_name`.
         """
         try:
-            logger.info(f"Loading embedding model: {model_name}")
-            self.model = SentenceTransformer(model_name)
+            logger.info(f"Loading embedding model: {model_path or model_name} (backend: {backend})")
+            self.model = self._load_model(model_path or model_name, backend)
+            self.model_name = model_name
+            self.backend = backend
+            self.model_path = model_path
+            self.dimension = self.model.get_sentence_embedding_dimension()
+            self.pool = None
+            # Backends and local model files produce different vectors, so each gets its own cache namespace
+            namespace = cache_namespace(model_name, backend, model_path)
+            self.cache = EmbeddingCache(cache_dir, namespace, self.dimension) if cache_dir else None
             logger.info("Embedding model loaded successfully.")
         except Exception as e:
-            logger.error(f"Failed to load SentenceTransformer model '{model_name}'. Error: {e}")
+            logger.error(f"Failed to load SentenceTransformer model '{model_path or model_name}'. Error: {e}")
+            raise
+
+    @staticmethod
+    def _load_model(name_or_path: str, backend: str):
+        # Imported here so that importing this module does not pull in PyTorch
+        from sentence_transformers import SentenceTransformer
+
+        if backend == "torch":
+            return SentenceTransformer(name_or_path)
+        if backend == "onnx":
+            model_kwargs = {"file_name": config.embedding_onnx_file} if config.embedding_onnx_file else None
+            return SentenceTransformer(name_or_path, backend="onnx", model_kwargs=model_kwargs)
+        if backend == "int8":
+            import torch
+            model = SentenceTransformer(name_or_path, device="cpu")
+            return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        raise ValueError(f"Unknown embedding backend '{backend}'. Expected 'torch', 'onnx' or 'int8'.")
+
+    def create_embeddings(self, texts: List[str], batch_size: Optional[int] = None, use_cache: bool = False) -> np.ndarray:
+        """
+        Generates vector embeddings for a batch of texts in a single encode call.
+
+        Duplicate texts are encoded once. With `use_cache`, vectors are also read
+        from and written to the persistent embedding cache so repeated catalog
+        texts are never encoded twice across runs. If a multi-process pool has
+        been started with `start_pool`, the encode is spread across its workers.
+
+        Args:
+            texts (List[str]): The input texts to embed.
+            batch_size (Optional[int]): The encode batch size. Defaults to `config.embedding_batch_size`.
+            use_cache (bool): Whether to consult the persistent embedding cache.
+
+        Returns:
+            np.ndarray: A float32 matrix of shape (len(texts), embedding_dim).
+        """
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        unique_texts = list(dict.fromkeys(texts))
+        cached = self.cache.get_many(unique_texts) if use_cache and self.cache is not None else {}
+        missing = [text for text in unique_texts if text not in cached]
+
+        vectors = {}
+        if missing:
+            encoded = self._encode(missing, batch_size or config.embedding_batch_size)
+            if use_cache and self.cache is not None:
+                self.cache.add(missing, encoded)
+            vectors.update(zip(missing, encoded))
+        vectors.update(cached)
+
+        if len(unique_texts) == len(texts) and not cached:
+            return encoded
+        return np.stack([vectors[text] for text in texts]).astype(np.float32, copy=False)
+
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        try:
+            if self.pool is not None:
+                embeddings = self.model.encode_multi_process(texts, self.pool, batch_size=batch_size)
+            else:
+                embeddings = self.model.encode(
+                    texts,
+                    batch_size=batch_size,
+                    convert_to_numpy=True,
+                    show_progress_bar=False,
+                )
+            return np.ascontiguousarray(embeddings, dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Failed to create batch embeddings. Error: {e}")
             raise
 
+    def start_pool(self, num_workers: int = config.embedding_num_workers):
+        """
+        Starts a multi-process encode pool so large batches use every CPU core.
+
+        Args:
+            num_workers (int): The number of worker processes. Values below 2 leave the pool disabled.
+        """
+        if self.pool is not None or num_workers < 2:
+            return
+        logger.info(f"Starting multi-process embedding pool with {num_workers} workers.")
+        self.pool = self.model.start_multi_process_pool(target_devices=["cpu"] * num_workers)
+
+    def stop_pool(self):
+        """
+        Stops the multi-process encode pool if one is running.
+        """
+        if self.pool is None:
+            return
+        self.model.stop_multi_process_pool(self.pool)
+        self.pool = None
+        logger.info("Multi-process embedding pool stopped.")
+
     def create_embedding(self, text: str) -> list[float]:
         """
         Generates a vector embedding for the given text.
@@ -63,40 +180,312 @@ class GroqModel:
         if not api_key:
             raise ValueError("Groq API key is missing.")
         try:
-            self.client = Groq(api_key=api_key)
+            import httpx
+            from groq import AsyncGroq, Groq
+            base_url = config.groq_base_url or None
+            timeout = httpx.Timeout(config.llm_read_timeout, connect=config.llm_connect_timeout)
+            limits = httpx.Limits(
+                max_connections=config.groq_max_connections,
+                max_keepalive_connections=config.groq_max_connections,
+            )
+            # Pooled clients with explicit timeouts; retries are handled here, within the request deadline
+            self.client = Groq(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=0,
+                http_client=httpx.Client(timeout=timeout, limits=limits),
+            )
+            self.async_client = AsyncGroq(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=0,
+                http_client=httpx.AsyncClient(timeout=timeout, limits=limits),
+            )
+            self.latencies = LatencyWindow()
+            # httpx timeouts bound each read, not the whole response, so sync calls run here under a total bound
+            self._sync_executor = ThreadPoolExecutor(max_workers=config.groq_max_connections, thread_name_prefix="groq-sync")
             self.model_name = model_name
+            self.response_cache = ResponseCache(
+                maxsize=config.llm_cache_size,
+                ttl=config.llm_cache_ttl,
+                db_path=config.llm_cache_path,
+            ) if config.llm_cache_size > 0 else None
+            self._single_flight = SingleFlight()
+            self._async_single_flight = AsyncSingleFlight()
             logger.info("Groq client initialized successfully.")
         except Exception as e:
             logger.error(f"Failed to initialize Groq client. Error: {e}")
             raise
 
-    def get_recommendation(self, prompt: str) -> str:
+    def _messages(self, prompt: str) -> list:
+        return [
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ]
+
+    def _store(self, prompt: str, chat_completion) -> str:
+        response = chat_completion.choices[0].message.content.strip()
+        if self.response_cache is not None:
+            self.response_cache.set(self.model_name, prompt, response)
+        return response
+
+    def _deadline(self, deadline: Optional[float]) -> float:
+        return deadline if deadline is not None else time.monotonic() + config.llm_deadline_seconds
+
+    def _remaining(self, deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if remaining < config.llm_min_attempt_seconds:
+            LLM_EVENTS.inc("deadline")
+            raise DeadlineExceeded("Not enough time left for an LLM call.")
+        return remaining
+
+    def _timeout(self, remaining: float):
+        import httpx
+        return httpx.Timeout(min(config.llm_read_timeout, remaining), connect=min(config.llm_connect_timeout, remaining))
+
+    def _complete(self, prompt: str, deadline: Optional[float] = None) -> str:
+        deadline = self._deadline(deadline)
+        for attempt in range(config.llm_max_retries + 1):
+            remaining = self._remaining(deadline)
+            started = time.monotonic()
+            future = self._sync_executor.submit(
+                self.client.chat.completions.create,
+                messages=self._messages(prompt),
+                model=self.model_name,
+                timeout=self._timeout(remaining),
+            )
+            try:
+                chat_completion = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                # The worker thread gives up on its own at the next read timeout
+                future.cancel()
+                LLM_EVENTS.inc("deadline")
+                raise DeadlineExceeded("The LLM call did not finish before the deadline.")
+            except Exception as e:
+                if attempt == config.llm_max_retries or not is_retryable(e):
+                    raise
+                LLM_EVENTS.inc("retry")
+                logger.warning(f"Retrying Groq call after error: {e}")
+                time.sleep(min(retry_delay(attempt, config.llm_retry_base_delay), max(0.0, deadline - time.monotonic())))
+                continue
+            self.latencies.record(time.monotonic() - started)
+            return self._store(prompt, chat_completion)
+
+    async def _acall(self, prompt: str, remaining: float):
+        started = time.monotonic()
+        chat_completion = await self.async_client.chat.completions.create(
+            messages=self._messages(prompt),
+            model=self.model_name,
+            timeout=self._timeout(remaining),
+        )
+        self.latencies.record(time.monotonic() - started)
+        return chat_completion
+
+    def hedge_delay(self) -> float:
+        """
+        Seconds to wait for the first call before sending a hedge: the recent latency percentile.
+        """
+        delay = self.latencies.percentile(config.llm_hedge_percentile)
+        return delay if delay is not None else config.llm_hedge_initial_delay
+
+    async def _ahedged(self, prompt: str, remaining: float):
+        """
+        Sends one call and, if it is slower than `hedge_delay`, a second identical one,
+        returning the first successful answer and cancelling the other.
+        """
+        primary = asyncio.ensure_future(self._acall(prompt, remaining))
+        if not config.llm_hedge_enabled:
+            return await primary
+
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay())
+            if not done:
+                LLM_EVENTS.inc("hedge")
+                hedge = asyncio.ensure_future(self._acall(prompt, remaining))
+                pending.add(hedge)
+            error = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            LLM_EVENTS.inc("hedge_win")
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _acomplete(self, prompt: str, deadline: Optional[float] = None) -> str:
+        deadline = self._deadline(deadline)
+        for attempt in range(config.llm_max_retries + 1):
+            remaining = self._remaining(deadline)
+            try:
+                chat_completion = await asyncio.wait_for(self._ahedged(prompt, remaining), timeout=remaining)
+            except asyncio.TimeoutError:
+                LLM_EVENTS.inc("deadline")
+                raise DeadlineExceeded("The LLM call did not finish before the deadline.")
+            except Exception as e:
+                if attempt == config.llm_max_retries or not is_retryable(e):
+                    raise
+                LLM_EVENTS.inc("retry")
+                logger.warning(f"Retrying Groq call after error: {e}")
+                await asyncio.sleep(min(retry_delay(attempt, config.llm_retry_base_delay), max(0.0, deadline - time.monotonic())))
+                continue
+            return self._store(prompt, chat_completion)
+
+    def generate(self, prompt: str, deadline: Optional[float] = None) -> str:
+        """
+        Generates a response with the pooled Groq client, raising on failure.
+
+        Responses are served from the response cache when possible, and
+        concurrent requests for the same prompt share one in-flight call.
+        Transient failures are retried with jittered backoff until `deadline`,
+        which also bounds the total time spent waiting for a slow response.
+
+        Args:
+            prompt (str): The complete prompt for the LLM.
+            deadline (Optional[float]): `time.monotonic()` by which to give up. Defaults to `config.llm_deadline_seconds` from now.
+
+        Returns:
+            str: The text content of the LLM's response.
+
+        Raises:
+            DeadlineExceeded: If no answer arrived before the deadline.
+        """
+        if self.response_cache is not None:
+            cached = self.response_cache.get(self.model_name, prompt)
+            if cached is not None:
+                return cached
+        return self._single_flight.do(response_key(self.model_name, prompt), lambda: self._complete(prompt, deadline))
+
+    def get_recommendation(self, prompt: str, deadline: Optional[float] = None) -> str:
         """
         Generates a recommendation by sending a prompt to the Groq LLM.
 
         Args:
             prompt (str): The complete prompt for the LLM.
+            deadline (Optional[float]): `time.monotonic()` by which to give up.
+
+        Returns:
+            str: The text content of the LLM's response, or an apology if it failed.
+        """
+        try:
+            return self.generate(prompt, deadline)
+        except Exception as e:
+            logger.error(f"Failed to get recommendation from Groq. Error: {e}")
+            return "Sorry, I was unable to generate a recommendation at this time."
+
+    async def agenerate(self, prompt: str, deadline: Optional[float] = None) -> str:
+        """
+        Generates a response with the pooled async Groq client, raising on failure.
+
+        Responses are served from the response cache when possible, and
+        concurrent requests for the same prompt share one in-flight call.
+        Transient failures are retried with jittered backoff and, with
+        `config.llm_hedge_enabled`, slow calls are hedged with a second one.
+
+        Args:
+            prompt (str): The complete prompt for the LLM.
+            deadline (Optional[float]): `time.monotonic()` by which to give up. Defaults to `config.llm_deadline_seconds` from now.
+
+        Returns:
+            str: The text content of the LLM's response.
+
+        Raises:
+            DeadlineExceeded: If no answer arrived before the deadline.
+        """
+        if self.response_cache is not None:
+            cached = self.response_cache.get(self.model_name, prompt)
+            if cached is not None:
+                return cached
+        return await self._async_single_flight.do(response_key(self.model_name, prompt), lambda: self._acomplete(prompt, deadline))
+
+    async def aget_recommendation(self, prompt: str, deadline: Optional[float] = None) -> str:
+        """
+        Async variant of `get_recommendation` built on the pooled async Groq client.
+
+        Args:
+            prompt (str): The complete prompt for the LLM.
+            deadline (Optional[float]): `time.monotonic()` by which to give up.
 
         Returns:
             str: The text content of the LLM's response.
         """
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
-                model=self.model_name,
-            )
-            response = chat_completion.choices[0].message.content
-            return response.strip()
+            return await self.agenerate(prompt, deadline)
         except Exception as e:
             logger.error(f"Failed to get recommendation from Groq. Error: {e}")
             return "Sorry, I was unable to generate a recommendation at this time."
 
-# Create singleton instances to be used across the application
-embedding_model = EmbeddingModel()
-groq_model = GroqModel()
+    async def astream_recommendation(self, prompt: str, deadline: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Streams a recommendation from the Groq LLM as text deltas arrive.
+
+        A cached response is yielded as a single chunk. A completed stream is
+        written to the response cache so later identical prompts are served from it.
+        The stream must start before `deadline`; once tokens flow it is not cut off.
+
+        Args:
+            prompt (str): The complete prompt for the LLM.
+            deadline (Optional[float]): `time.monotonic()` by which the stream must start.
+
+        Yields:
+            str: Consecutive pieces of the LLM's response.
+        """
+        if self.response_cache is not None:
+            cached = self.response_cache.get(self.model_name, prompt)
+            if cached is not None:
+                yield cached
+                return
+
+        remaining = self._remaining(self._deadline(deadline))
+        try:
+            stream = await asyncio.wait_for(
+                self.async_client.chat.completions.create(
+                    messages=self._messages(prompt),
+                    model=self.model_name,
+                    stream=True,
+                    timeout=self._timeout(remaining),
+                ),
+                timeout=remaining,
+            )
+        except asyncio.TimeoutError:
+            LLM_EVENTS.inc("deadline")
+            raise DeadlineExceeded("The LLM stream did not start before the deadline.")
+        parts = []
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+
+        if self.response_cache is not None:
+            self.response_cache.set(self.model_name, prompt, "".join(parts).strip())
+
+    async def aclose(self):
+        """
+        Closes the pooled HTTP clients.
+        """
+        self._sync_executor.shutdown(wait=False)
+        self.client.close()
+        await self.async_client.close()
+
+def create_embedding_model() -> EmbeddingModel:
+    """
+    Builds the in-process model, or a thin client of the shared embedding server when `config.embedding_server_socket` is set.
+    """
+    if config.embedding_server_socket:
+        from .embedding_server import RemoteEmbeddingModel
+        return RemoteEmbeddingModel(socket_path=config.embedding_server_socket)
+    return EmbeddingModel()
+
+# Singleton instances to be used across the application, built on first use
+embedding_model: EmbeddingModel = Lazy(create_embedding_model, "embedding model")
+groq_model: GroqModel = Lazy(GroqModel, "Groq client")
 
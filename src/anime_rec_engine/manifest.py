@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from .data_models import Anime
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Part of every content hash: bump it when the metadata written per record changes (e.g. the
+# genre flag keys), so the next incremental run rewrites every row instead of only changed ones
+METADATA_VERSION = 2
+
+def content_hash(anime: Anime, text: str) -> str:
+    """
+    Computes a stable hash over the embedded text and the stored metadata of an anime.
+
+    Args:
+        anime (Anime): The anime whose metadata is stored alongside the vector.
+        text (str): The exact text that is embedded for this anime.
+
+    Returns:
+        str: A hex SHA-256 digest that changes whenever the text, the metadata or `METADATA_VERSION` change.
+    """
+    payload = json.dumps({"text": text, "metadata": anime.dict(), "version": METADATA_VERSION}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def file_stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Identifies the current version of an index artifact without reading it.
+
+    Artifacts are written to a temporary file and renamed into place, so any
+    rewrite changes the inode, and usually the size and modification time.
+
+    Returns:
+        Optional[Tuple[int, int, int]]: The inode, size and nanosecond modification time, or None if the file is missing.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+class IndexManifest:
+    """
+    Persisted mapping of `anime_id` to the content hash last written to the vector store.
+
+    The manifest lets the training pipeline work out which rows are new, changed,
+    removed or unchanged since the previous run without re-embedding the catalog.
+    """
+    def __init__(self, path: str, entries: Dict[int, str] = None):
+        """
+        Initializes the IndexManifest.
+
+        Args:
+            path (str): The JSON file the manifest is stored in.
+            entries (Dict[int, str]): Initial `anime_id` to hash entries.
+        """
+        self.path = path
+        self.entries = dict(entries or {})
+
+    @classmethod
+    def load(cls, path: str) -> "IndexManifest":
+        """
+        Loads a manifest from disk, returning an empty one if the file is missing or unreadable.
+        """
+        if not os.path.exists(path):
+            return cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            return cls(path, {int(anime_id): digest for anime_id, digest in raw.items()})
+        except Exception as e:
+            logger.warning(f"Could not read index manifest at '{path}', starting from an empty one. Error: {e}")
+            return cls(path)
+
+    def save(self):
+        """
+        Atomically writes the manifest to disk.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({str(anime_id): digest for anime_id, digest in self.entries.items()}, f)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Index manifest with {len(self.entries)} entries saved to '{self.path}'.")
+
+    def ids(self) -> Set[int]:
+        return set(self.entries)
+
+    def get(self, anime_id: int) -> str:
+        return self.entries.get(anime_id)
+
+    def update(self, hashes: Dict[int, str]):
+        self.entries.update(hashes)
+
+    def remove(self, anime_ids: Iterable[int]):
+        for anime_id in anime_ids:
+            self.entries.pop(anime_id, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __contains__(self, anime_id: int) -> bool:
+        return anime_id in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class IngestCheckpoint:
+    """
+    Records which batches of an ingestion run have been durably written.
+
+    The checkpoint is tied to the input file (path, size and modification
+    time) and to the batching parameters, so a resumed run only skips
+    batches if it would cut the file into exactly the same batches.
+    """
+    def __init__(self, path: str, signature: Dict[str, Any], completed: Set[int] = None):
+        """
+        Initializes the IngestCheckpoint.
+
+        Args:
+            path (str): The JSON file the checkpoint is stored in.
+            signature (Dict[str, Any]): Identifies the input file and batching of the run.
+            completed (Set[int]): Indices of batches already written.
+        """
+        self.path = path
+        self.signature = signature
+        self.completed = set(completed or ())
+
+    @staticmethod
+    def make_signature(data_filepath: str, **params: Any) -> Dict[str, Any]:
+        stat = os.stat(data_filepath)
+        return {"data_filepath": os.path.abspath(data_filepath), "size": stat.st_size, "mtime": stat.st_mtime, **params}
+
+    @classmethod
+    def load(cls, path: str, signature: Dict[str, Any]) -> "IngestCheckpoint":
+        """
+        Loads the checkpoint of an interrupted run with the same signature, or starts a fresh one.
+        """
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+                if raw.get("signature") == signature:
+                    return cls(path, signature, set(raw.get("completed", [])))
+                logger.info("Ignoring ingest checkpoint from a run with a different input or batching.")
+            except Exception as e:
+                logger.warning(f"Could not read ingest checkpoint at '{path}', starting from scratch. Error: {e}")
+        return cls(path, signature)
+
+    @property
+    def resuming(self) -> bool:
+        return bool(self.completed)
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": self.signature, "completed": sorted(self.completed)}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """
+        Removes the checkpoint file once a run has finished.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.completed.clear()
@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .numpy_vector_store import l2_normalize, top_k
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class NeighborTable:
+    """
+    Precomputed top-K nearest neighbours of every anime in the catalog.
+
+    Neighbours are stored as int32 row indices with float16 cosine scores, so
+    the table for the whole catalog stays a few megabytes. Looking up an
+    `anime_id` is a dict access plus a row slice, with no model inference.
+    """
+    def __init__(self, ids: np.ndarray, neighbors: np.ndarray, scores: np.ndarray, metadatas: List[dict]):
+        """
+        Initializes the NeighborTable.
+
+        Args:
+            ids (np.ndarray): The int64 `anime_id` of each row.
+            neighbors (np.ndarray): An int32 (n, k) matrix of neighbour rows, most similar first.
+            scores (np.ndarray): A float16 (n, k) matrix of the matching cosine similarities.
+            metadatas (List[dict]): The metadata of each row.
+        """
+        self.ids = ids
+        self.neighbors = neighbors
+        self.scores = scores
+        self.metadatas = metadatas
+        self._rows: Dict[int, int] = {int(anime_id): row for row, anime_id in enumerate(ids)}
+
+    @property
+    def k(self) -> int:
+        return self.neighbors.shape[1]
+
+    def __contains__(self, anime_id: int) -> bool:
+        return anime_id in self._rows
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def metadata(self, anime_id: int) -> Optional[dict]:
+        row = self._rows.get(anime_id)
+        return dict(self.metadatas[row]) if row is not None else None
+
+    def lookup(self, anime_id: int, n_results: int = 10) -> Optional[List[Tuple[dict, float]]]:
+        """
+        Returns the precomputed neighbours of an anime.
+
+        Args:
+            anime_id (int): The anime to look up.
+            n_results (int): The number of neighbours to return, at most `k`.
+
+        Returns:
+            Optional[List[Tuple[dict, float]]]: (metadata, similarity) pairs, or None if the anime is unknown.
+        """
+        row = self._rows.get(anime_id)
+        if row is None:
+            return None
+        return [
+            (dict(self.metadatas[neighbor]), float(score))
+            for neighbor, score in zip(self.neighbors[row, :n_results], self.scores[row, :n_results])
+        ]
+
+    def save(self, path: str):
+        """
+        Writes the table to a single `.npz` file.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            ids=self.ids,
+            neighbors=self.neighbors,
+            scores=self.scores,
+            metadatas=np.array(json.dumps(self.metadatas, ensure_ascii=False)),
+        )
+        os.replace(tmp_path, path)
+        logger.info(f"Neighbor table for {len(self.ids)} animes (k={self.k}) saved to '{path}'.")
+
+    @classmethod
+    def load(cls, path: str) -> "NeighborTable":
+        """
+        Reads a table written by `save`.
+        """
+        with np.load(path) as data:
+            table = cls(
+                ids=data["ids"],
+                neighbors=data["neighbors"],
+                scores=data["scores"],
+                metadatas=json.loads(str(data["metadatas"])),
+            )
+        logger.info(f"Neighbor table for {len(table)} animes (k={table.k}) loaded from '{path}'.")
+        return table
+
+def build_neighbor_table(ids: np.ndarray, embeddings: np.ndarray, metadatas: List[dict], k: int = 20, block_size: int = 1024) -> NeighborTable:
+    """
+    Computes the top-K neighbours of every row with blocked matrix multiplication.
+
+    Similarities are computed one block of rows at a time against the whole
+    normalized matrix, so peak memory is `block_size * n` floats rather than `n * n`.
+
+    Args:
+        ids (np.ndarray): The `anime_id` of each row.
+        embeddings (np.ndarray): The (n, dim) embedding matrix.
+        metadatas (List[dict]): The metadata of each row.
+        k (int): The number of neighbours kept per anime.
+        block_size (int): The number of rows scored per matrix multiplication.
+
+    Returns:
+        NeighborTable: The neighbour table, excluding each anime from its own neighbours.
+    """
+    n = len(ids)
+    k = max(0, min(k, n - 1))
+    vectors = l2_normalize(embeddings)
+    neighbors = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float16)
+
+    for start in range(0, n, block_size):
+        end = min(start + block_size, n)
+        similarities = vectors[start:end] @ vectors.T
+        # An anime is never its own neighbour
+        similarities[np.arange(end - start), np.arange(start, end)] = -np.inf
+        rows = top_k(similarities, k)[:, :k]
+        neighbors[start:end] = rows
+        scores[start:end] = np.take_along_axis(similarities, rows, axis=1)
+
+    return NeighborTable(np.asarray(ids, dtype=np.int64), neighbors, scores, metadatas)
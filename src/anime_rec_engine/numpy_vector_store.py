@@ -0,0 +1,343 @@
+import json
+import logging
+import os
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .data_models import Anime, AnimeFilters
+from .vector_store import VectorStore
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# File layout: header | ids (int64[n]) | vectors (float32[n, dim]) | metadata (UTF-8 JSON)
+_MAGIC = b"ANIVEC01"
+_HEADER = struct.Struct("<8sQQQ")
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Returns a float32 copy of `vectors` with every row scaled to unit length.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Returns the indices of the `k` highest scores along the last axis, best first.
+    """
+    if k >= scores.shape[-1]:
+        return np.argsort(-scores, axis=-1)
+    candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1)
+    return np.take_along_axis(candidates, order, axis=-1)
+
+class MetadataColumns:
+    """
+    Columnar view of the index metadata used to pre-filter candidates.
+
+    Numeric fields become NumPy arrays, types become integer codes and each
+    genre becomes a packed bitset over rows, so a filter is evaluated with a
+    handful of vectorized comparisons and bitwise ops.
+    """
+    def __init__(self, metadatas: List[dict]):
+        self.size = len(metadatas)
+        self.ratings = np.array([metadata.get("rating", 0.0) for metadata in metadatas], dtype=np.float32)
+        self.members = np.array([metadata.get("members", 0) for metadata in metadatas], dtype=np.int64)
+
+        self.type_codes: Dict[str, int] = {}
+        self.types = np.array(
+            [self.type_codes.setdefault(metadata.get("type", ""), len(self.type_codes)) for metadata in metadatas],
+            dtype=np.int32,
+        )
+
+        genre_rows: Dict[str, List[int]] = {}
+        for row, metadata in enumerate(metadatas):
+            for genre in str(metadata.get("genre", "")).split(","):
+                genre = genre.strip()
+                if genre:
+                    genre_rows.setdefault(genre, []).append(row)
+        self.genre_bitsets: Dict[str, np.ndarray] = {}
+        for genre, rows in genre_rows.items():
+            bits = np.zeros(self.size, dtype=bool)
+            bits[rows] = True
+            self.genre_bitsets[genre] = np.packbits(bits)
+
+    def mask(self, filters: AnimeFilters) -> np.ndarray:
+        """
+        Returns a boolean mask of the rows that match `filters`.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        if filters.types:
+            codes = [self.type_codes[anime_type] for anime_type in filters.types if anime_type in self.type_codes]
+            mask &= np.isin(self.types, codes)
+        if filters.min_rating is not None:
+            mask &= self.ratings >= filters.min_rating
+        if filters.max_rating is not None:
+            mask &= self.ratings <= filters.max_rating
+        if filters.min_members is not None:
+            mask &= self.members >= filters.min_members
+        if filters.max_members is not None:
+            mask &= self.members <= filters.max_members
+
+        if filters.include_genres or filters.exclude_genres:
+            empty = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+            genre_bits = np.full_like(empty, 0xFF)
+            for genre in filters.include_genres or []:
+                genre_bits &= self.genre_bitsets.get(genre, empty)
+            for genre in filters.exclude_genres or []:
+                genre_bits &= ~self.genre_bitsets.get(genre, empty)
+            mask &= np.unpackbits(genre_bits, count=self.size).astype(bool)
+        return mask
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact, in-process vector index backed by a single contiguous float32 matrix.
+
+    Vectors are L2-normalized on write so cosine similarity is a plain dot
+    product: a query is one matrix-vector product followed by `argpartition`.
+    The index is saved to a compact binary file whose vector block can be
+    memory-mapped on load, so several processes share the same pages.
+    Filtered queries mask the candidate rows with precomputed metadata
+    columns and genre bitsets before the similarity scan.
+    """
+    def __init__(self, path: str = "./numpy_index/anime_index.bin", mmap: bool = True):
+        """
+        Initializes the NumpyVectorStore, loading the index file if it exists.
+
+        Args:
+            path (str): Path of the binary index file.
+            mmap (bool): Whether to memory-map the vector block instead of reading it into memory.
+        """
+        super().__init__()
+        self.path = path
+        self.mmap = mmap
+        self._lock = threading.Lock()
+        self._ids = np.empty(0, dtype=np.int64)
+        self._vectors: Optional[np.ndarray] = None
+        self._size = 0
+        self._metadatas: List[dict] = []
+        self._rows: Dict[int, int] = {}
+        self._columns: Optional[MetadataColumns] = None
+        if os.path.exists(path):
+            self.load()
+        else:
+            logger.info(f"No numpy index found at '{path}'; starting with an empty index.")
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """
+        The normalized vectors currently in the index, one row per anime.
+        """
+        if self._vectors is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._vectors[:self._size]
+
+    def _ensure_capacity(self, dimension: int, extra: int):
+        needed = self._size + extra
+        if self._vectors is None:
+            self._vectors = np.empty((max(needed, 1024), dimension), dtype=np.float32)
+            self._ids = np.empty(self._vectors.shape[0], dtype=np.int64)
+            return
+        if self._vectors.shape[1] != dimension:
+            raise ValueError(f"Embedding dimension {dimension} does not match index dimension {self._vectors.shape[1]}.")
+        # Memory-mapped blocks are read-only; the first write copies them into a growable buffer
+        if needed > self._vectors.shape[0] or isinstance(self._vectors, np.memmap):
+            capacity = max(needed, 2 * self._vectors.shape[0])
+            vectors = np.empty((capacity, dimension), dtype=np.float32)
+            vectors[:self._size] = self._vectors[:self._size]
+            ids = np.empty(capacity, dtype=np.int64)
+            ids[:self._size] = self._ids[:self._size]
+            self._vectors, self._ids = vectors, ids
+
+    def recreate_collection(self):
+        with self._lock:
+            self._ids = np.empty(0, dtype=np.int64)
+            self._vectors = None
+            self._size = 0
+            self._metadatas = []
+            self._rows = {}
+        self._columns = None
+        self._notify_change()
+        logger.info("Numpy index cleared and ready for data population.")
+
+    def _write(self, animes: List[Anime], embeddings: np.ndarray, overwrite: bool):
+        if not animes or embeddings is None or len(embeddings) == 0:
+            logger.warning("Write called with empty animes or embeddings.")
+            return
+
+        _, metadatas = self._to_records(animes, embeddings)
+        vectors = l2_normalize(embeddings)
+        with self._lock:
+            self._ensure_capacity(vectors.shape[1], len(animes))
+            for anime, vector, metadata in zip(animes, vectors, metadatas):
+                row = self._rows.get(anime.anime_id)
+                if row is not None:
+                    if not overwrite:
+                        raise ValueError(f"Anime {anime.anime_id} is already in the index.")
+                    self._metadatas[row] = metadata
+                else:
+                    row = self._size
+                    self._size += 1
+                    self._rows[anime.anime_id] = row
+                    self._ids[row] = anime.anime_id
+                    self._metadatas.append(metadata)
+                self._vectors[row] = vector
+        self._columns = None
+        self._notify_change()
+
+    def add_animes(self, animes: List[Anime], embeddings: np.ndarray):
+        self._write(animes, embeddings, overwrite=False)
+
+    def upsert_animes(self, animes: List[Anime], embeddings: np.ndarray):
+        self._write(animes, embeddings, overwrite=True)
+
+    def delete_animes(self, anime_ids: List[int]):
+        if not anime_ids:
+            return
+        with self._lock:
+            rows = [self._rows[anime_id] for anime_id in anime_ids if anime_id in self._rows]
+            if not rows:
+                return
+            keep = np.ones(self._size, dtype=bool)
+            keep[rows] = False
+            self._ids = self._ids[:self._size][keep]
+            self._vectors = np.ascontiguousarray(self._vectors[:self._size][keep])
+            self._metadatas = [metadata for metadata, kept in zip(self._metadatas, keep) if kept]
+            self._size = len(self._ids)
+            self._rows = {int(anime_id): row for row, anime_id in enumerate(self._ids)}
+        self._columns = None
+        self._notify_change()
+
+    def count(self) -> int:
+        return self._size
+
+    @property
+    def columns(self) -> MetadataColumns:
+        """
+        The columnar metadata of the index, rebuilt lazily after writes.
+        """
+        columns = self._columns
+        if columns is None or columns.size != self._size:
+            with self._lock:
+                columns = self._columns = MetadataColumns(self._metadatas)
+        return columns
+
+    def find_similar_animes(self, query_embedding: np.ndarray, n_results: int = 10, filters: Optional[AnimeFilters] = None) -> List[dict]:
+        if query_embedding is None or len(query_embedding) == 0:
+            logger.error("find_similar_animes called with an empty query_embedding.")
+            return []
+        return self.find_similar_animes_batch(np.asarray(query_embedding)[None, :], n_results, filters)[0]
+
+    def _search_rows(self, query_embeddings: np.ndarray, n_results: int, filters: Optional[AnimeFilters]) -> List[np.ndarray]:
+        if self._size == 0:
+            return [np.empty(0, dtype=np.int64) for _ in range(len(query_embeddings))]
+
+        queries = l2_normalize(np.atleast_2d(query_embeddings))
+        if filters is None or filters.is_empty():
+            scores = queries @ self.vectors.T
+            return list(top_k(scores, min(n_results, self._size)))
+        candidates = np.flatnonzero(self.columns.mask(filters))
+        if len(candidates) == 0:
+            return [np.empty(0, dtype=np.int64) for _ in range(len(query_embeddings))]
+        scores = queries @ self.vectors[candidates].T
+        return list(candidates[top_k(scores, min(n_results, len(candidates)))])
+
+    def find_similar_animes_batch(self, query_embeddings: np.ndarray, n_results: int = 10, filters: Optional[AnimeFilters] = None) -> List[List[dict]]:
+        if query_embeddings is None or len(query_embeddings) == 0:
+            return []
+        rows = self._search_rows(query_embeddings, n_results, filters)
+        return [[dict(self._metadatas[row]) for row in query_rows] for query_rows in rows]
+
+    def find_similar_ids_batch(self, query_embeddings: np.ndarray, n_results: int = 10, filters: Optional[AnimeFilters] = None) -> List[List[int]]:
+        if query_embeddings is None or len(query_embeddings) == 0:
+            return []
+        rows = self._search_rows(query_embeddings, n_results, filters)
+        return [self._ids[query_rows].tolist() for query_rows in rows]
+
+    def export(self) -> Tuple[np.ndarray, np.ndarray, List[dict]]:
+        with self._lock:
+            return self._ids[:self._size].copy(), np.array(self.vectors), [dict(metadata) for metadata in self._metadatas]
+
+    def save(self, path: Optional[str] = None):
+        """
+        Atomically writes the index to a single binary file.
+
+        Args:
+            path (Optional[str]): Destination file. Defaults to the path the store was created with.
+        """
+        path = path or self.path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            dimension = self._vectors.shape[1] if self._vectors is not None else 0
+            metadata = json.dumps(self._metadatas, ensure_ascii=False).encode("utf-8")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, self._size, dimension, len(metadata)))
+                f.write(np.ascontiguousarray(self._ids[:self._size], dtype=np.int64).tobytes())
+                if self._size:
+                    f.write(np.ascontiguousarray(self.vectors, dtype=np.float32).tobytes())
+                f.write(metadata)
+            os.replace(tmp_path, path)
+        logger.info(f"Numpy index with {self._size} vectors saved to '{path}'.")
+
+    def load(self, path: Optional[str] = None):
+        """
+        Loads the index from a binary file written by `save`.
+
+        Args:
+            path (Optional[str]): Source file. Defaults to the path the store was created with.
+        """
+        path = path or self.path
+        with open(path, "rb") as f:
+            magic, size, dimension, metadata_length = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"'{path}' is not a numpy vector index file.")
+            ids = np.frombuffer(f.read(8 * size), dtype=np.int64).copy()
+            vectors_offset = f.tell()
+            if self.mmap and size:
+                f.seek(4 * size * dimension, os.SEEK_CUR)
+            else:
+                vectors = np.frombuffer(f.read(4 * size * dimension), dtype=np.float32).reshape(size, dimension).copy()
+            metadatas = json.loads(f.read(metadata_length).decode("utf-8"))
+
+        if size and self.mmap:
+            vectors = np.memmap(path, dtype=np.float32, mode="r", offset=vectors_offset, shape=(size, dimension))
+        with self._lock:
+            self._ids = ids
+            self._vectors = vectors if size else None
+            self._size = int(size)
+            self._metadatas = metadatas
+            self._rows = {int(anime_id): row for row, anime_id in enumerate(ids)}
+        self._columns = None
+        self._notify_change()
+        logger.info(f"Numpy index with {size} vectors loaded from '{path}'{' (memory-mapped)' if self.mmap else ''}.")
+
+    def reload(self):
+        if os.path.exists(self.path):
+            self.load()
+
+    @property
+    def checkpoint_path(self) -> str:
+        return f"{self.path}.checkpoint"
+
+    def persist(self, checkpoint: bool = False):
+        if checkpoint:
+            # Serving processes reload whenever `path` changes, so a half-built index stays out of it
+            self.save(self.checkpoint_path)
+            return
+        self.save()
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def restore_checkpoint(self) -> bool:
+        if not os.path.exists(self.checkpoint_path):
+            return False
+        self.load(self.checkpoint_path)
+        return True
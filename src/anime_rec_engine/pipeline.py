@@ -1,74 +1,440 @@
+import numpy as np
 import pandas as pd
-from typing import List, Generator
+from typing import Any, Dict, List, Generator, Optional
 import logging
+import os
+import queue
+import threading
+import time
 from tqdm import tqdm
 
+from anime_rec_engine.catalog import build_catalog
+from anime_rec_engine.config import config
 from anime_rec_engine.data_models import Anime
 from anime_rec_engine.llm_models import embedding_model
+from anime_rec_engine.manifest import IndexManifest, IngestCheckpoint, content_hash
+from anime_rec_engine.neighbors import build_neighbor_table
+from anime_rec_engine.quantization import build_quantized_index, evaluate_recall, sample_queries
 from anime_rec_engine.vector_store import VECTOR_STORE  # <-- Import the instance
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+REQUIRED_COLUMNS = ['anime_id', 'name', 'genre', 'type', 'episodes', 'rating', 'members']
+
+class RejectReport:
+    """
+    Collects rows rejected by the loader instead of logging a warning per row.
+
+    Counts are kept per reason, and if `path` is set every rejected row is
+    appended to a CSV file with its reason, so memory use stays bounded.
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.rows_read = 0
+        self.rows_rejected = 0
+        self.reasons: Dict[str, int] = {}
+        self._header_written = False
+
+    def add(self, rejected: pd.DataFrame):
+        if rejected.empty:
+            return
+        self.rows_rejected += len(rejected)
+        for reason, count in rejected['reject_reason'].value_counts().items():
+            self.reasons[reason] = self.reasons.get(reason, 0) + int(count)
+        if self.path:
+            rejected.to_csv(self.path, mode='a' if self._header_written else 'w', header=not self._header_written, index=False)
+            self._header_written = True
+
+    def summary(self) -> str:
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in sorted(self.reasons.items())) or "none"
+        return f"{self.rows_rejected} of {self.rows_read} rows rejected ({reasons})."
+
+def _validate_chunk(df: pd.DataFrame, report: RejectReport) -> pd.DataFrame:
+    """
+    Coerces and validates one chunk column-wise, moving invalid rows to the report.
+    """
+    report.rows_read += len(df)
+    for column in REQUIRED_COLUMNS:
+        if column not in df.columns:
+            df[column] = np.nan
+
+    reason = pd.Series('', index=df.index, dtype=object)
+    # Later checks must not overwrite the first reason found for a row
+    def reject(mask: pd.Series, why: str):
+        reason[mask & (reason == '')] = why
+
+    reject(df['anime_id'].isna(), 'missing anime_id')
+    reject(df['name'].isna(), 'missing name')
+    reject(df['genre'].isna(), 'missing genre')
+    reject(df['type'].isna(), 'missing type')
+
+    # Convert data types safely; unparseable counts and ratings fall back to neutral values
+    anime_id = pd.to_numeric(df['anime_id'], errors='coerce')
+    reject(anime_id.isna() | (anime_id % 1 != 0), 'invalid anime_id')
+    df['episodes'] = pd.to_numeric(df['episodes'], errors='coerce').fillna(0).astype(np.int64)
+    df['rating'] = pd.to_numeric(df['rating'], errors='coerce').fillna(0.0).astype(np.float64)
+    df['members'] = pd.to_numeric(df['members'], errors='coerce').fillna(0).astype(np.int64)
+
+    rejected = reason != ''
+    report.add(df.loc[rejected].assign(reject_reason=reason[rejected]))
+
+    df = df.loc[~rejected, REQUIRED_COLUMNS].copy()
+    df['anime_id'] = anime_id[~rejected].astype(np.int64)
+    df['name'] = df['name'].astype(str)
+    df['type'] = df['type'].astype(str)
+    # Convert genre from string to list
+    df['genre'] = df['genre'].astype(str).str.split(',').map(lambda genres: [g.strip() for g in genres])
+    return df
+
+def iter_anime_batches(
+    data_filepath: str,
+    batch_size: int = 50,
+    chunk_size: int = config.ingest_chunk_size,
+    report: Optional[RejectReport] = None,
+) -> Generator[List[Anime], None, None]:
+    """
+    Streams validated animes from a CSV file in fixed-size batches.
+
+    The file is read `chunk_size` rows at a time and each chunk is coerced
+    and validated with column-wise operations, so peak memory depends on the
+    chunk size, not on the file size. Invalid rows go to `report`.
+
+    Args:
+        data_filepath (str): Path to the anime CSV file.
+        batch_size (int): Number of animes per yielded batch.
+        chunk_size (int): Number of CSV rows parsed at a time.
+        report (Optional[RejectReport]): Collects rejected rows.
+
+    Yields:
+        List[Anime]: Batches of at most `batch_size` animes.
+    """
+    report = report if report is not None else RejectReport()
+    logging.info(f"Streaming data from {data_filepath} in chunks of {chunk_size} rows...")
+    for chunk in pd.read_csv(data_filepath, chunksize=chunk_size):
+        valid = _validate_chunk(chunk, report)
+        # Values were validated column-wise above, so per-row model validation is skipped
+        animes = [Anime.construct(**record) for record in valid.to_dict('records')]
+        for i in range(0, len(animes), batch_size):
+            yield animes[i:i + batch_size]
+
 def load_anime_data(data_filepath: str) -> List[Anime]:
     logging.info(f"Loading data from {data_filepath}...")
+    report = RejectReport()
     try:
-        df = pd.read_csv(data_filepath)
+        anime_list = [anime for batch in iter_anime_batches(data_filepath, report=report) for anime in batch]
     except FileNotFoundError:
         logging.error(f"Data file not found at {data_filepath}")
         return []
-    
-    # Drop rows with critical missing data
-    df.dropna(subset=['anime_id', 'name', 'genre'], inplace=True)
-    
-    # Fill missing ratings with a neutral value
-    df['rating'].fillna(0.0, inplace=True)
-    df['episodes'].fillna(0, inplace=True)  # <-- Fill NaN episodes with 0
-
-    # Convert data types safely
-    df['anime_id'] = pd.to_numeric(df['anime_id'], errors='coerce')
-    df['episodes'] = pd.to_numeric(df['episodes'], errors='coerce', downcast='integer').fillna(0).astype(int)  # <-- Safe coercion
-    df['rating'] = pd.to_numeric(df['rating'], errors='coerce').fillna(0.0)
-    df['members'] = pd.to_numeric(df['members'], errors='coerce', downcast='integer').fillna(0).astype(int)
-    df.dropna(subset=['anime_id'], inplace=True)
-
-    # Convert genre from string to list
-    df['genre'] = df['genre'].apply(lambda x: [g.strip() for g in x.split(',')] if isinstance(x, str) else [])
 
-    anime_list = []
-    for _, row in df.iterrows():
-        try:
-            anime_list.append(Anime(**row.to_dict()))
-        except Exception as e:
-            logging.warning(f"Skipping row due to validation error: {e} | Data: {row.to_dict()}")
-
-    logging.info(f"Successfully loaded and validated {len(anime_list)} anime records.")
+    logging.info(f"Successfully loaded and validated {len(anime_list)} anime records. {report.summary()}")
     return anime_list
 
 def batch_generator(data: List, batch_size: int) -> Generator[List, None, None]:
     for i in range(0, len(data), batch_size):
         yield data[i:i + batch_size]
 
-def run_training_pipeline(data_filepath: str, batch_size: int = 50):
-    anime_data = load_anime_data(data_filepath)
-    if not anime_data:
-        logging.error("Pipeline stopped: No data loaded.")
-        return
+def build_embedding_text(anime: Anime) -> str:
+    return "Genres: " + ", ".join(anime.genre)
 
-    logging.info("Starting to generate embeddings and populate the vector store...")
-    
-    # Reset the collection using the instance
-    VECTOR_STORE.recreate_collection()
-
-    total_batches = (len(anime_data) + batch_size - 1) // batch_size
-    
-    for batch in tqdm(batch_generator(anime_data, batch_size), total=total_batches, desc="Processing batches"):
-        texts_to_embed = ["Genres: " + ", ".join(anime.genre) for anime in batch]
-        embeddings = [embedding_model.create_embedding(text) for text in texts_to_embed]
-
-        if embeddings:
-            VECTOR_STORE.add_animes(animes=batch, embeddings=embeddings)
+class StageStats:
+    """
+    Accumulates the rows processed and busy time of one ingestion stage.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, rows: int, seconds: float):
+        with self._lock:
+            self.rows += rows
+            self.busy_seconds += seconds
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "rows": self.rows,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "rows_per_second": round(self.rows / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+        }
+
+def _drop_duplicates(batch: List[Anime], seen_ids: set, report: RejectReport) -> List[Anime]:
+    """
+    Keeps the first row of every `anime_id` across the whole file and moves repeats to the report.
+    """
+    unique, duplicates = [], []
+    for anime in batch:
+        if anime.anime_id in seen_ids:
+            duplicates.append(anime)
         else:
-            logging.warning("Skipping batch due to embedding failure.")
-            
-    logging.info("Training pipeline completed successfully. Vector store is populated.")
+            seen_ids.add(anime.anime_id)
+            unique.append(anime)
+    if duplicates:
+        rejected = pd.DataFrame([dict(anime.dict(), genre=", ".join(anime.genre)) for anime in duplicates])
+        report.add(rejected.assign(reject_reason='duplicate anime_id'))
+    return unique
+
+_STOP = object()
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    # Bounded puts that give up once another stage has failed
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def run_training_pipeline(
+    data_filepath: str,
+    batch_size: int = 50,
+    num_workers: int = config.embedding_num_workers,
+    incremental: bool = False,
+    build_neighbors: bool = True,
+    reject_report_path: Optional[str] = config.reject_report_path,
+    encode_workers: int = config.ingest_encode_workers,
+    resume: bool = True,
+) -> Dict[str, Any]:
+    """
+    Embeds the catalog and writes it to the vector store.
+
+    Loading, embedding and writing run as overlapped stages connected by
+    bounded queues: a loader thread streams and diffs CSV batches,
+    `encode_workers` threads embed them and the calling thread writes them to
+    the store. Completed batches are checkpointed every
+    `config.ingest_checkpoint_every` batches, so an interrupted run resumes
+    where it stopped instead of starting over. Batches whose embedding fails
+    are skipped and reported, and the checkpoint is then kept so the next
+    run retries just those batches.
+
+    In incremental mode only new or changed rows are re-embedded and upserted,
+    rows missing from the CSV are deleted and everything else is left in place.
+    Otherwise the collection is dropped and rebuilt from scratch.
+
+    Args:
+        data_filepath (str): Path to the anime CSV file.
+        batch_size (int): Number of animes embedded and written per batch.
+        num_workers (int): Size of the multi-process encode pool (0 disables it). Defaults to `config.embedding_num_workers`.
+        incremental (bool): Whether to apply only the changes since the last run.
+        build_neighbors (bool): Whether to rebuild the item-to-item neighbour table afterwards.
+        reject_report_path (Optional[str]): CSV file that receives rejected rows. Empty keeps only the counts.
+        encode_workers (int): Number of embedding threads. Forced to 1 when the process pool is used.
+        resume (bool): Whether to resume from the checkpoint of an interrupted run with the same input.
+
+    Returns:
+        Dict[str, Any]: Counts of added, updated, deleted, unchanged, resumed, rejected and skipped rows,
+            the indices of batches that failed to embed under "skipped_batches",
+            per-stage throughput under "stages" and quantized search recall@k under "quantization".
+    """
+    stats = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0, "resumed": 0, "rejected": 0, "skipped": 0}
+    if not os.path.exists(data_filepath):
+        logging.error(f"Pipeline stopped: Data file not found at {data_filepath}")
+        return stats
+
+    logging.info("Starting to generate embeddings and populate the vector store...")
+
+    signature = IngestCheckpoint.make_signature(
+        data_filepath, batch_size=batch_size, chunk_size=config.ingest_chunk_size, incremental=incremental
+    )
+    checkpoint = IngestCheckpoint.load(config.ingest_checkpoint_path, signature) if resume else IngestCheckpoint(config.ingest_checkpoint_path, signature)
+    if checkpoint.resuming:
+        logging.info(f"Resuming interrupted run: {len(checkpoint.completed)} batches already written.")
+        VECTOR_STORE.restore_checkpoint()
+
+    manifest = IndexManifest.load(config.index_manifest_path)
+    if not incremental:
+        # Reset the collection using the instance, unless resuming a rebuild that already started
+        if not checkpoint.resuming:
+            VECTOR_STORE.recreate_collection()
+        manifest.clear()
+    elif len(manifest) and VECTOR_STORE.count() == 0:
+        logging.warning("Index manifest found but the vector store is empty; re-indexing everything.")
+        manifest.clear()
+    previous_ids = manifest.ids()
+    seen_ids = set()
+
+    if embedding_model.cache is not None:
+        embedding_model.cache.reset_stats()
+
+    report = RejectReport(reject_report_path or None)
+    load_stats, embed_stats, write_stats = StageStats("load"), StageStats("embed"), StageStats("write")
+
+    # Spread encoding across processes for large re-indexes
+    embedding_model.start_pool(num_workers)
+    # The process pool's queues are shared, so concurrent encode calls would mix up results
+    encode_workers = 1 if embedding_model.pool is not None else max(1, encode_workers)
+
+    embed_queue: queue.Queue = queue.Queue(maxsize=config.ingest_queue_size)
+    write_queue: queue.Queue = queue.Queue(maxsize=config.ingest_queue_size)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    skipped_batches: List[tuple] = []
+
+    def load_stage():
+        try:
+            batches = iter_anime_batches(data_filepath, batch_size=batch_size, report=report)
+            for index, batch in enumerate(batches):
+                started = time.perf_counter()
+                batch = _drop_duplicates(batch, seen_ids, report)
+                hashes = {anime.anime_id: content_hash(anime, build_embedding_text(anime)) for anime in batch}
+                if index in checkpoint.completed:
+                    # Already written by the interrupted run; only its manifest entries are missing
+                    manifest.update(hashes)
+                    stats["resumed"] += len(batch)
+                    load_stats.record(len(batch), time.perf_counter() - started)
+                    continue
+                to_write = [anime for anime in batch if manifest.get(anime.anime_id) != hashes[anime.anime_id]]
+                stats["unchanged"] += len(batch) - len(to_write)
+                load_stats.record(len(batch), time.perf_counter() - started)
+                if not _put(embed_queue, (index, to_write, hashes), stop):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            for _ in range(encode_workers):
+                _put(embed_queue, _STOP, stop)
+
+    def embed_stage():
+        try:
+            while not stop.is_set():
+                try:
+                    item = embed_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _STOP:
+                    break
+                index, to_write, hashes = item
+                embeddings = None
+                if to_write:
+                    started = time.perf_counter()
+                    try:
+                        embeddings = embedding_model.create_embeddings(
+                            [build_embedding_text(anime) for anime in to_write], use_cache=True
+                        )
+                    except Exception as e:
+                        # Left out of the checkpoint, so the next run retries the batch
+                        logging.error(f"Skipping batch {index} due to embedding failure: {e}")
+                        skipped_batches.append((index, len(to_write)))
+                        continue
+                    embed_stats.record(len(to_write), time.perf_counter() - started)
+                if not _put(write_queue, (index, to_write, hashes, embeddings), stop):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(write_queue, _STOP, stop)
+
+    threads = [threading.Thread(target=load_stage, name="ingest-load", daemon=True)]
+    threads += [threading.Thread(target=embed_stage, name=f"ingest-embed-{i}", daemon=True) for i in range(encode_workers)]
+    wall_started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    progress = tqdm(unit="rows", desc="Processing rows")
+    pending_checkpoint = 0
+    try:
+        finished_workers = 0
+        while finished_workers < encode_workers and not stop.is_set():
+            try:
+                item = write_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                finished_workers += 1
+                continue
+            index, to_write, hashes, embeddings = item
+            if to_write:
+                started = time.perf_counter()
+                VECTOR_STORE.upsert_animes(animes=to_write, embeddings=embeddings)
+                write_stats.record(len(to_write), time.perf_counter() - started)
+                for anime in to_write:
+                    stats["updated" if anime.anime_id in manifest else "added"] += 1
+                manifest.update({anime.anime_id: hashes[anime.anime_id] for anime in to_write})
+            progress.update(len(hashes))
+
+            checkpoint.completed.add(index)
+            pending_checkpoint += 1
+            # A checkpoint may rewrite the whole index, so the interval grows with the work done to keep total writes linear
+            if pending_checkpoint >= max(config.ingest_checkpoint_every, len(checkpoint.completed) // 2):
+                VECTOR_STORE.persist(checkpoint=True)
+                checkpoint.save()
+                pending_checkpoint = 0
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        progress.close()
+        for thread in threads:
+            thread.join()
+        embedding_model.stop_pool()
+    if errors:
+        raise errors[0]
+    wall_seconds = time.perf_counter() - wall_started
+
+    stats["rejected"] = report.rows_rejected
+    if report.rows_read == 0:
+        logging.error("Pipeline stopped: No data loaded.")
+        return stats
+    logging.info(f"Loader: {report.summary()}")
+
+    removed_ids = sorted(previous_ids - seen_ids)
+    if removed_ids:
+        VECTOR_STORE.delete_animes(removed_ids)
+        manifest.remove(removed_ids)
+    stats["deleted"] = len(removed_ids)
+
+    VECTOR_STORE.persist()
+    manifest.save()
+    stats["skipped"] = sum(rows for _, rows in skipped_batches)
+    stats["skipped_batches"] = sorted(index for index, _ in skipped_batches)
+    if skipped_batches:
+        # Keeping the checkpoint makes the next run with the same input redo only the failed batches
+        checkpoint.save()
+        logging.error(
+            f"{len(skipped_batches)} batches ({stats['skipped']} rows) failed to embed and were not written. "
+            f"Checkpoint kept at '{checkpoint.path}'; re-run the pipeline to retry them."
+        )
+    else:
+        checkpoint.clear()
+
+    ids, embeddings, metadatas = VECTOR_STORE.export()
+    build_catalog(metadatas).save(config.catalog_path)
+    quantized_index = build_quantized_index(ids, embeddings)
+    quantized_index.save(config.quantized_index_dir)
+    if config.quantized_recall_queries > 0 and len(quantized_index):
+        stats["quantization"] = evaluate_recall(
+            quantized_index,
+            sample_queries(quantized_index, config.quantized_recall_queries),
+            rescore_factors=(1, config.quantized_rescore_factor),
+        )
+        logging.info(f"Quantized search: {stats['quantization']}")
+    if build_neighbors:
+        logging.info(f"Building top-{config.neighbor_k} neighbour table...")
+        build_neighbor_table(ids, embeddings, metadatas, k=config.neighbor_k).save(config.neighbor_table_path)
+
+    if embedding_model.cache is not None:
+        cache = embedding_model.cache
+        logging.info(
+            f"Embedding cache: {cache.hits} hits, {cache.misses} misses "
+            f"(hit rate {cache.hit_rate():.1%}) for {embed_stats.rows} embedded rows."
+        )
+
+    stats["stages"] = {stage.name: stage.summary() for stage in (load_stats, embed_stats, write_stats)}
+    stats["stages"]["total"] = {
+        "rows": report.rows_read,
+        "wall_seconds": round(wall_seconds, 3),
+        "rows_per_second": round(report.rows_read / wall_seconds, 1) if wall_seconds else 0.0,
+    }
+    for name, summary in stats["stages"].items():
+        logging.info(f"Stage '{name}': {summary}")
+
+    logging.info(
+        f"Training pipeline completed successfully. Added: {stats['added']}, updated: {stats['updated']}, "
+        f"deleted: {stats['deleted']}, unchanged: {stats['unchanged']}, resumed: {stats['resumed']}, "
+        f"rejected: {stats['rejected']}, skipped: {stats['skipped']}."
+    )
+    return stats
@@ -1,4 +1,46 @@
-from typing import List, Dict, Any
+import math
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+from .config import config
+
+# Approximate characters per token for the model families we target; no tokenizer is shipped for them
+CHARS_PER_TOKEN = {
+    "llama": 3.8,
+    "mixtral": 3.6,
+    "gemma": 4.0,
+}
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+def _chars_per_token(model_name: str) -> float:
+    return next((value for family, value in CHARS_PER_TOKEN.items() if family in model_name.lower()), DEFAULT_CHARS_PER_TOKEN)
+
+def estimate_tokens(text: str, model_name: str = config.llm_model_name) -> int:
+    """
+    Estimates the number of tokens `text` uses for the given model.
+
+    Args:
+        text (str): The text to measure.
+        model_name (str): The target LLM, used to pick the characters-per-token ratio.
+
+    Returns:
+        int: The estimated token count, rounded up.
+    """
+    return math.ceil(len(text) / _chars_per_token(model_name))
+
+@dataclass
+class BuiltPrompt:
+    """
+    A packed prompt together with the token accounting that produced it.
+    """
+    text: str
+    prompt_tokens: int
+    prefix_tokens: int
+    context_tokens: int
+    included: int
+    truncated: int
+    dropped: int
+    included_animes: List[Dict[str, Any]] = field(default_factory=list)
 
 class PromptTemplate:
     """
@@ -19,9 +61,28 @@ class PromptTemplate:
             "2. Recommend multiple suitable animes from the provided context (up to 10).\n"
             "3. Explain WHY you are recommending them, connecting their themes or genres "
             "to the user's query.\n"
-            "4. Be engaging, friendly, and encouraging."
+            "4. Be engaging, friendly, and encouraging.\n\n"
+            "The context lists one anime per line as: name | type | rating | genres, "
+            "most relevant first."
         )
 
+    @staticmethod
+    def _genres(anime: Dict[str, Any]) -> str:
+        genres = anime.get('genre') or []
+        # The vector stores return genres as one comma-joined string
+        return genres if isinstance(genres, str) else ", ".join(genres)
+
+    def format_row(self, anime: Dict[str, Any]) -> str:
+        """
+        Formats one anime as a dense `name | type | rating | genres` row.
+        """
+        return f"{anime.get('name', 'N/A')} | {anime.get('type', 'N/A')} | {anime.get('rating', 'N/A')} | {self._genres(anime) or 'N/A'}"
+
+    @staticmethod
+    def _minimum_row_tokens(anime: Dict[str, Any], model_name: str) -> int:
+        # The name and type of a truncated row, plus its newline
+        return estimate_tokens(f"{anime.get('name', 'N/A')} | {anime.get('type', 'N/A')} |", model_name) + 1
+
     def format_context(self, context: List[Dict[str, Any]]) -> str:
         """
         Formats the list of similar animes into a string for the prompt.
@@ -30,23 +91,70 @@ class PromptTemplate:
             context (List[Dict[str, Any]]): A list of anime data dictionaries from the vector store.
         
         Returns:
-            str: A formatted string containing the details of the context animes.
+            str: One dense row per anime.
+        """
+        return "\n".join(self.format_row(anime) for anime in context)
+
+    def build_prompt(self, query: str, context: List[Dict[str, Any]], token_budget: Optional[int] = None, model_name: str = config.llm_model_name) -> BuiltPrompt:
+        """
+        Builds the final prompt, packing as much context as fits into the token budget.
+
+        The system instruction comes first and never changes, so providers can
+        cache it as a prompt prefix. Context rows are added in retrieval order
+        (most similar first); when the budget runs out, the next row is
+        truncated if a useful part of it fits and all lower-ranked rows are dropped.
+        A query too long to leave room for the top row is truncated instead.
+
+        Args:
+            query (str): The user's original query.
+            context (List[Dict[str, Any]]): The context animes, most similar first.
+            token_budget (Optional[int]): Maximum tokens of the whole prompt. Defaults to `config.prompt_token_budget`.
+            model_name (str): The target LLM, used for token estimates.
+
+        Returns:
+            BuiltPrompt: The prompt text and its token accounting.
         """
-        formatted_contexts = []
+        token_budget = token_budget or config.prompt_token_budget
+        prefix = f"{self.system_instruction}\n\n"
+        head = f"{prefix}--- USER QUERY ---\n{query}\n\n--- RELEVANT ANIME CONTEXT ---\n"
+        tail = "\n\n--- RECOMMENDATION ---\n"
+        remaining = token_budget - estimate_tokens(head + tail, model_name)
+        if context and remaining < self._minimum_row_tokens(context[0], model_name):
+            # A long query gives way to the most similar anime, so the LLM always has some context
+            excess = self._minimum_row_tokens(context[0], model_name) - remaining + 1
+            query = query[:max(0, len(query) - math.ceil(excess * _chars_per_token(model_name)) - 3)] + "..."
+            head = f"{prefix}--- USER QUERY ---\n{query}\n\n--- RELEVANT ANIME CONTEXT ---\n"
+            remaining = token_budget - estimate_tokens(head + tail, model_name)
+
+        rows, included_animes, truncated = [], [], 0
         for anime in context:
-            genre_list = anime.get('genre', [])
-            genres = ", ".join(genre_list) if genre_list else "N/A"
-            
-            # --- THIS IS THE UPDATED PART ---
-            # The 'Synopsis' field has been completely removed.
-            context_str = (
-                f"Name: {anime.get('name', 'N/A')}\n"
-                f"Genres: {genres}\n"
-                f"Type: {anime.get('type', 'N/A')}\n"
-                f"Rating: {anime.get('rating', 'N/A')}"
-            )
-            formatted_contexts.append(context_str)
-        return "\n---\n".join(formatted_contexts)
+            row = self.format_row(anime)
+            # +1 for the newline joining rows
+            cost = estimate_tokens(row, model_name) + 1
+            if cost <= remaining:
+                rows.append(row)
+                included_animes.append(anime)
+                remaining -= cost
+                continue
+            # Keep a truncated row only if at least the name and type fit
+            if remaining >= self._minimum_row_tokens(anime, model_name):
+                rows.append(row[:max(0, int((remaining - 1) * _chars_per_token(model_name)) - 3)] + "...")
+                included_animes.append(anime)
+                truncated = 1
+            break
+
+        context_text = "\n".join(rows)
+        text = f"{head}{context_text}{tail}"
+        return BuiltPrompt(
+            text=text,
+            prompt_tokens=estimate_tokens(text, model_name),
+            prefix_tokens=estimate_tokens(prefix, model_name),
+            context_tokens=estimate_tokens(context_text, model_name),
+            included=len(rows),
+            truncated=truncated,
+            dropped=len(context) - len(rows),
+            included_animes=included_animes,
+        )
 
     def create_prompt(self, query: str, context: List[Dict[str, Any]]) -> str:
         """
@@ -59,16 +167,31 @@ class PromptTemplate:
         Returns:
             str: The final prompt ready to be sent to the LLM.
         """
-        formatted_context = self.format_context(context)
-        
-        return (
-            f"{self.system_instruction}\n\n"
-            f"--- USER QUERY ---\n"
-            f"{query}\n\n"
-            f"--- RELEVANT ANIME CONTEXT ---\n"
-            f"{formatted_context}\n\n"
-            f"--- RECOMMENDATION ---\n"
-        )
+        return self.build_prompt(query, context).text
+
+    def render_fallback(self, query: str, context: List[Dict[str, Any]], limit: int = 5) -> str:
+        """
+        Renders a deterministic recommendation from the context animes, used when the LLM cannot answer in time.
+
+        Args:
+            query (str): The user's original query.
+            context (List[Dict[str, Any]]): The context animes, most similar first.
+            limit (int): The maximum number of animes listed.
+
+        Returns:
+            str: A short recommendation listing the closest matches.
+        """
+        lines = [f"Here are the closest matches to \"{query}\" in our catalog:"]
+        for i, anime in enumerate(context[:limit], start=1):
+            genres = self._genres(anime)
+            details = ", ".join(part for part in (anime.get('type'), f"rated {anime['rating']}" if anime.get('rating') else None) if part)
+            line = f"{i}. {anime.get('name', 'N/A')}"
+            if details:
+                line += f" ({details})"
+            if genres:
+                line += f" - {genres}"
+            lines.append(line)
+        return "\n".join(lines)
 
 # Create a singleton instance to be used across the application
 PROMPT_TEMPLATE = PromptTemplate()
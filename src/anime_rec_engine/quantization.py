@@ -0,0 +1,296 @@
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .numpy_vector_store import l2_normalize, top_k
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MODES = ("exact", "int8", "binary")
+ARRAY_NAMES = ("ids", "vectors", "int8_codes", "int8_scales", "binary_codes")
+# Written last by `QuantizedIndex.save`; names the array files of the current generation
+MANIFEST_NAME = "index.json"
+# Popcount of every byte value, for Hamming distances on NumPy versions without bitwise_count
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+def _popcount(codes: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(codes)
+    return _POPCOUNT[codes]
+
+def scalar_quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-dimension int8 quantization.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The int8 (n, dim) codes and the float32 (dim,) scales, with `vectors ~ codes * scales`.
+    """
+    scales = np.abs(vectors).max(axis=0) / 127.0 if len(vectors) else np.ones(vectors.shape[1], dtype=np.float32)
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+    return codes, scales
+
+def binary_quantize(vectors: np.ndarray) -> np.ndarray:
+    """
+    1-bit quantization: the sign of every dimension, packed 8 dimensions per byte.
+    """
+    return np.packbits(vectors > 0, axis=-1)
+
+class QuantizedIndex:
+    """
+    Compressed first-pass index with exact rescoring.
+
+    Every vector is stored three ways: int8 codes (4x smaller), 1-bit sign
+    codes (32x smaller) and the normalized float32 vectors. A search scans
+    only the codes chosen by `mode` to pick a shortlist of `k * rescore_factor`
+    rows, then rescores the shortlist exactly against the float vectors.
+    All arrays are `.npy` files memory-mapped on load, so the float block is
+    only paged in for shortlisted rows and every process shares the pages.
+    Each save writes a new generation of files and then a manifest naming
+    them, so a reader never mixes arrays of two different saves.
+    """
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """
+        Initializes the QuantizedIndex from its arrays.
+
+        Args:
+            arrays (Dict[str, np.ndarray]): "ids", "vectors", "int8_codes", "int8_scales" and "binary_codes".
+        """
+        self.arrays = arrays
+        self.ids = arrays["ids"]
+        self.vectors = arrays["vectors"]
+        self.int8_codes = arrays["int8_codes"]
+        self.int8_scales = arrays["int8_scales"]
+        self.binary_codes = arrays["binary_codes"]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def bytes_per_vector(self) -> Dict[str, int]:
+        return {
+            "exact": self.vectors.shape[1] * 4 if len(self) else 0,
+            "int8": self.int8_codes.shape[1] if len(self) else 0,
+            "binary": self.binary_codes.shape[1] if len(self) else 0,
+        }
+
+    def _first_pass(self, queries: np.ndarray, mode: str, block_size: int) -> np.ndarray:
+        # Higher is better for every mode; blocks bound the temporary matrices
+        scores = np.empty((len(queries), len(self)), dtype=np.float32)
+        if mode == "int8":
+            scaled = queries * self.int8_scales
+            for start in range(0, len(self), block_size):
+                block = self.int8_codes[start:start + block_size].astype(np.float32)
+                scores[:, start:start + len(block)] = scaled @ block.T
+        elif mode == "binary":
+            query_codes = binary_quantize(queries)
+            for start in range(0, len(self), block_size):
+                block = np.asarray(self.binary_codes[start:start + block_size])
+                for i, query_code in enumerate(query_codes):
+                    scores[i, start:start + len(block)] = -_popcount(block ^ query_code).sum(axis=1, dtype=np.int32)
+        else:
+            for start in range(0, len(self), block_size):
+                block = self.vectors[start:start + block_size]
+                scores[:, start:start + len(block)] = queries @ block.T
+        return scores
+
+    def search(
+        self,
+        query_embeddings: np.ndarray,
+        k: int = 10,
+        mode: str = "binary",
+        rescore_factor: int = 10,
+        block_size: int = 16384,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the `k` most similar rows of each query.
+
+        Args:
+            query_embeddings (np.ndarray): A (q, dim) matrix of query embeddings.
+            k (int): The number of results per query.
+            mode (str): "binary" (Hamming first pass), "int8" (quantized dot product first pass) or "exact".
+            rescore_factor (int): The shortlist holds `k * rescore_factor` rows per query.
+            block_size (int): Rows scored per block in the first pass.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The (q, k) rows and exact cosine scores, best first.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown quantized search mode '{mode}'. Expected one of {MODES}.")
+        queries = l2_normalize(np.atleast_2d(query_embeddings))
+        k = min(k, len(self))
+        if k == 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+
+        scores = self._first_pass(queries, mode, block_size)
+        if mode == "exact":
+            rows = top_k(scores, k)[:, :k]
+            return rows, np.take_along_axis(scores, rows, axis=1)
+
+        shortlist = top_k(scores, min(len(self), k * rescore_factor))
+        rows = np.empty((len(queries), k), dtype=np.int64)
+        exact = np.empty((len(queries), k), dtype=np.float32)
+        for i, candidates in enumerate(shortlist):
+            # Sorted reads keep the memory-mapped page accesses sequential
+            candidates = np.sort(candidates)
+            candidate_scores = np.asarray(self.vectors[candidates]) @ queries[i]
+            best = top_k(candidate_scores, k)[:k]
+            rows[i], exact[i] = candidates[best], candidate_scores[best]
+        return rows, exact
+
+    def search_ids(self, query_embeddings: np.ndarray, k: int = 10, mode: str = "binary", rescore_factor: int = 10) -> List[List[int]]:
+        rows, _ = self.search(query_embeddings, k=k, mode=mode, rescore_factor=rescore_factor)
+        return [self.ids[query_rows].tolist() for query_rows in rows]
+
+    @staticmethod
+    def manifest_path(directory: str) -> str:
+        return os.path.join(directory, MANIFEST_NAME)
+
+    def save(self, directory: str):
+        """
+        Writes the arrays as a new generation of `.npy` files in `directory`, then atomically points the manifest at them.
+
+        Files of generations before the previous one are removed; the previous
+        one is kept for readers that loaded its manifest but not yet its arrays.
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = self.manifest_path(directory)
+        previous = _read_manifest(manifest_path)
+        generation = previous["generation"] + 1 if previous else 1
+        files = {}
+        for name in ARRAY_NAMES:
+            files[name] = f"{name}.{generation}.npy"
+            np.save(os.path.join(directory, files[name]), np.ascontiguousarray(self.arrays[name]))
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"generation": generation, "count": len(self), "files": files}, f)
+        os.replace(tmp_path, manifest_path)
+
+        keep = set(files.values()) | set(previous["files"].values() if previous else ())
+        for filename in os.listdir(directory):
+            if filename.endswith(".npy") and filename.split(".")[0] in ARRAY_NAMES and filename not in keep:
+                os.remove(os.path.join(directory, filename))
+        logger.info(f"Quantized index generation {generation} of {len(self)} vectors saved to '{directory}'.")
+
+    @classmethod
+    def load(cls, directory: str) -> "QuantizedIndex":
+        """
+        Memory-maps the generation named by the manifest written by `save`.
+
+        Raises:
+            FileNotFoundError: If `directory` holds no manifest.
+            ValueError: If the arrays disagree on the number of vectors.
+        """
+        manifest = _read_manifest(cls.manifest_path(directory))
+        if manifest is None:
+            raise FileNotFoundError(f"No quantized index manifest in '{directory}'.")
+        arrays = {name: np.load(os.path.join(directory, manifest["files"][name]), mmap_mode="r") for name in ARRAY_NAMES}
+        lengths = {len(arrays[name]) for name in ("ids", "vectors", "int8_codes", "binary_codes")}
+        if lengths != {manifest["count"]}:
+            raise ValueError(f"Quantized index in '{directory}' is inconsistent: expected {manifest['count']} vectors, found {sorted(lengths)}.")
+        index = cls(arrays)
+        logger.info(f"Quantized index generation {manifest['generation']} of {len(index)} vectors memory-mapped from '{directory}'.")
+        return index
+
+def _read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def build_quantized_index(ids: np.ndarray, embeddings: np.ndarray) -> QuantizedIndex:
+    """
+    Normalizes the embeddings and derives their int8 and binary codes.
+
+    Args:
+        ids (np.ndarray): The `anime_id` of each row.
+        embeddings (np.ndarray): The (n, dim) embedding matrix.
+
+    Returns:
+        QuantizedIndex: The index, with rows in the order given.
+    """
+    vectors = l2_normalize(embeddings)
+    int8_codes, int8_scales = scalar_quantize(vectors)
+    return QuantizedIndex({
+        "ids": np.asarray(ids, dtype=np.int64),
+        "vectors": vectors,
+        "int8_codes": int8_codes,
+        "int8_scales": int8_scales,
+        "binary_codes": binary_quantize(vectors),
+    })
+
+def evaluate_recall(
+    index: QuantizedIndex,
+    queries: np.ndarray,
+    k: int = 10,
+    modes: Sequence[str] = ("int8", "binary"),
+    rescore_factors: Sequence[int] = (1, 4, 10),
+) -> Dict[str, Any]:
+    """
+    Measures recall@k and latency of each quantized operating point against exact search.
+
+    Args:
+        index (QuantizedIndex): The index to evaluate.
+        queries (np.ndarray): A (q, dim) matrix of query embeddings.
+        k (int): The k in recall@k.
+        modes (Sequence[str]): The first-pass modes to evaluate.
+        rescore_factors (Sequence[int]): The shortlist multipliers to evaluate.
+
+    Returns:
+        Dict[str, Any]: Bytes per vector and, per "mode@factor", recall@k and mean milliseconds per query.
+    """
+    started = time.perf_counter()
+    expected, _ = index.search(queries, k=k, mode="exact")
+    exact_ms = 1000.0 * (time.perf_counter() - started) / len(queries)
+    k = expected.shape[1]
+
+    results: Dict[str, Any] = {
+        "vectors": len(index),
+        "queries": len(queries),
+        "k": k,
+        "bytes_per_vector": index.bytes_per_vector(),
+        "exact": {"recall": 1.0, "ms_per_query": round(exact_ms, 3)},
+    }
+    for mode in modes:
+        for factor in rescore_factors:
+            started = time.perf_counter()
+            found, _ = index.search(queries, k=k, mode=mode, rescore_factor=factor)
+            ms = 1000.0 * (time.perf_counter() - started) / len(queries)
+            recall = np.mean([
+                len(set(want).intersection(got)) / k if k else 1.0
+                for want, got in zip(expected.tolist(), found.tolist())
+            ])
+            results[f"{mode}@{factor}"] = {f"recall_at_{k}": round(float(recall), 4), "ms_per_query": round(ms, 3)}
+    return results
+
+def sample_queries(index: QuantizedIndex, count: int, noise: float = 0.05, seed: int = 0) -> np.ndarray:
+    """
+    Draws perturbed catalog vectors as stand-in queries, so recall can be measured without a query log.
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(index), size=min(count, len(index)), replace=False))
+    vectors = np.asarray(index.vectors[rows])
+    return l2_normalize(vectors + rng.normal(0.0, noise, size=vectors.shape).astype(np.float32))
+
+def main():
+    from .config import config
+
+    parser = argparse.ArgumentParser(description="Report recall@k and latency of quantized search against exact search.")
+    parser.add_argument("--index", default=config.quantized_index_dir, help="Directory of the quantized index.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled queries.")
+    parser.add_argument("--k", type=int, default=10, help="The k in recall@k.")
+    parser.add_argument("--factors", default="1,2,4,10,20", help="Comma-separated rescore factors.")
+    args = parser.parse_args()
+
+    index = QuantizedIndex.load(args.index)
+    factors = [int(factor) for factor in args.factors.split(",")]
+    print(json.dumps(evaluate_recall(index, sample_queries(index, args.queries), k=args.k, rescore_factors=factors), indent=2))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -1,50 +1,599 @@
+import asyncio
+import contextlib
+import contextvars
 import logging
-from typing import Dict, Any
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, List, Optional
 
-from anime_rec_engine.llm_models import EmbeddingModel, GroqModel
-from anime_rec_engine.vector_store import VectorStore
+import numpy as np
+
+from anime_rec_engine.batching import MicroBatcher
+from anime_rec_engine.cache import LRUCache
+from anime_rec_engine.catalog import Catalog
+from anime_rec_engine.concurrency import ConcurrencyLimiter, OverloadedError
+from anime_rec_engine.config import config
+from anime_rec_engine.data_models import AnimeFilters
+from anime_rec_engine.lazy import Lazy
+from anime_rec_engine.llm_models import embedding_model, groq_model
+from anime_rec_engine.manifest import file_stamp
+from anime_rec_engine.neighbors import NeighborTable
+from anime_rec_engine.quantization import QuantizedIndex
+from anime_rec_engine.vector_store import VECTOR_STORE
 from anime_rec_engine.prompts import PROMPT_TEMPLATE
+from anime_rec_engine.telemetry import LLM_EVENTS, PROMPT_CONTEXT_ITEMS, PROMPT_TOKENS, PROMPTS, span
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a query for cache lookups by lower-casing it and collapsing whitespace.
+    """
+    return " ".join(query.lower().split())
+
+def filters_key(filters: Optional[AnimeFilters]) -> tuple:
+    return filters.cache_key() if filters is not None else ()
+
+def request_deadline() -> float:
+    """
+    Returns the `time.monotonic()` time by which a request arriving now must be answered.
+    """
+    return time.monotonic() + config.llm_deadline_seconds
 
 class Recommender:
     """
     Orchestrates the entire recommendation process.
+
+    Query embeddings and retrieval results are kept in bounded LRU/TTL caches.
+    The retrieval cache is cleared whenever the vector store is written to in
+    this process, and whenever the files a training run writes last change on
+    disk, so results from before a re-index are never served afterwards, even
+    when the re-index ran in another process.
     """
-    def get_recommendation(self, query: str, n_results: int = 10) -> Dict[str, Any]:
+    def __init__(self):
+        self.query_cache = LRUCache(maxsize=config.query_cache_size, ttl=config.query_cache_ttl)
+        self.retrieval_cache = LRUCache(maxsize=config.retrieval_cache_size, ttl=config.retrieval_cache_ttl)
+        self._index_generation = 0
+        self._neighbor_table: Optional[NeighborTable] = None
+        self._catalog: Optional[Catalog] = None
+        self._quantized_index: Optional[QuantizedIndex] = None
+        # Bounded pool that keeps CPU-bound embedding and blocking vector queries off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=config.blocking_executor_workers, thread_name_prefix="recommender")
+        # Coalesces concurrent single-query encodes into one model call
+        self.micro_batcher = MicroBatcher(
+            encode_fn=lambda texts: embedding_model.create_embeddings(texts),
+            max_batch_size=config.embedding_max_batch,
+            max_wait_ms=config.embedding_batch_window_ms,
+        ) if config.embedding_batch_window_ms > 0 else None
+        VECTOR_STORE.add_change_listener(self.invalidate_retrieval_cache)
+        self._generation_lock = threading.Lock()
+        self._index_stamps = self._current_index_stamps()
+
+    def _index_artifacts(self) -> List[str]:
+        # Rewritten at the end of every training run, whichever process ran it
+        paths = [config.index_manifest_path, config.catalog_path, config.neighbor_table_path]
+        if config.vector_store_backend == "numpy":
+            paths.append(config.numpy_index_path)
+        if config.quantized_search != "off":
+            paths.append(QuantizedIndex.manifest_path(config.quantized_index_dir))
+        return paths
+
+    def _current_index_stamps(self) -> Dict[str, Any]:
+        return {path: file_stamp(path) for path in self._index_artifacts()}
+
+    def check_index_generation(self):
+        """
+        Invalidates cached results and loaded artifacts if a training run rewrote the index since the last check.
+
+        Costs one `stat` per artifact, so it runs on every lookup. The vector
+        store is reloaded as well when its own files changed: the numpy index
+        file, or for Chroma the manifest each training run writes after a rebuild.
+        """
+        stamps = self._current_index_stamps()
+        with self._generation_lock:
+            if stamps == self._index_stamps:
+                return
+            previous, self._index_stamps = self._index_stamps, stamps
+        logging.info("Index artifacts changed on disk; dropping cached retrieval results.")
+        self.invalidate_retrieval_cache()
+        store_path = config.numpy_index_path if config.vector_store_backend == "numpy" else config.index_manifest_path
+        store_stamp = stamps.get(store_path)
+        if store_stamp is not None and store_stamp != previous.get(store_path) and VECTOR_STORE.initialized:
+            VECTOR_STORE.reload()
+
+    def invalidate_retrieval_cache(self):
+        """
+        Drops all cached retrieval results. Called by the vector store after every write and by `check_index_generation`.
+        """
+        self._index_generation += 1
+        self.retrieval_cache.clear()
+        self._neighbor_table = None
+        self._catalog = None
+        self._quantized_index = None
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {"query": self.query_cache.stats(), "retrieval": self.retrieval_cache.stats()}
+
+    def create_prompt(self, query: str, context: List[Dict[str, Any]]) -> str:
+        """
+        Packs the context into a prompt within `config.prompt_token_budget` and records its token counts.
+
+        Raises:
+            ValueError: If none of the context fits, so callers serve the template answer instead of an ungrounded one.
+        """
+        with span("prompt"):
+            built = PROMPT_TEMPLATE.build_prompt(query=query, context=context)
+        if context and not built.included:
+            raise ValueError(f"No context anime fits the prompt budget of {config.prompt_token_budget} tokens.")
+        PROMPTS.inc()
+        PROMPT_TOKENS.inc(amount=built.prompt_tokens)
+        PROMPT_CONTEXT_ITEMS.inc("included", amount=built.included)
+        PROMPT_CONTEXT_ITEMS.inc("truncated", amount=built.truncated)
+        PROMPT_CONTEXT_ITEMS.inc("dropped", amount=built.dropped)
+        logging.info(
+            f"Prompt uses ~{built.prompt_tokens} tokens ({built.prefix_tokens} cacheable prefix, {built.context_tokens} context) "
+            f"with {built.included} of {len(context)} context animes."
+        )
+        return built.text
+
+    async def _run_blocking(self, fn, *args, stage: str = "retrieve"):
+        # Runs on the executor inside a copy of the current context, so stage spans reach the request's trace
+        with span(stage):
+            return await asyncio.get_running_loop().run_in_executor(self.executor, contextvars.copy_context().run, fn, *args)
+
+    def embed_query(self, query: str) -> Optional[np.ndarray]:
+        """
+        Returns the embedding of a query, served from the query cache when possible.
+        """
+        key = normalize_query(query)
+        query_embedding = self.query_cache.get(key)
+        if query_embedding is None:
+            logging.info(f"Generating embedding for query: '{query}'")
+            try:
+                with span("embed"):
+                    if self.micro_batcher is not None:
+                        query_embedding = self.micro_batcher.encode(key)
+                    else:
+                        query_embedding = embedding_model.create_embeddings([key])[0]
+            except Exception:
+                return None
+            self.query_cache.set(key, query_embedding)
+        return query_embedding
+
+    @property
+    def catalog(self) -> Optional[Catalog]:
+        """
+        The shared, memory-mapped metadata catalog, loaded on first use and reloaded after a rebuild.
+        """
+        self.check_index_generation()
+        if self._catalog is None and os.path.exists(config.catalog_path):
+            self._catalog = Catalog.load(config.catalog_path)
+        return self._catalog
+
+    @property
+    def quantized_index(self) -> Optional[QuantizedIndex]:
+        """
+        The memory-mapped quantized index, loaded on first use when `config.quantized_search` is enabled.
+        """
+        self.check_index_generation()
+        if (
+            self._quantized_index is None
+            and config.quantized_search != "off"
+            and os.path.exists(QuantizedIndex.manifest_path(config.quantized_index_dir))
+        ):
+            self._quantized_index = QuantizedIndex.load(config.quantized_index_dir)
+        return self._quantized_index
+
+    def _search(self, query_embeddings: np.ndarray, n_results: int, filters: Optional[AnimeFilters]) -> List[List[Dict[str, Any]]]:
+        # With a catalog the store only returns ids, and metadata comes from the shared catalog pages
+        catalog = self.catalog
+        if catalog is None:
+            return VECTOR_STORE.find_similar_animes_batch(query_embeddings, n_results=n_results, filters=filters)
+        quantized_index = self.quantized_index
+        if quantized_index is not None and (filters is None or filters.is_empty()):
+            # Filtered queries stay on the vector store, which pre-filters before scoring
+            ids = quantized_index.search_ids(
+                query_embeddings,
+                k=n_results,
+                mode=config.quantized_search,
+                rescore_factor=config.quantized_rescore_factor,
+            )
+        else:
+            ids = VECTOR_STORE.find_similar_ids_batch(query_embeddings, n_results=n_results, filters=filters)
+        return [catalog.metadatas(query_ids) for query_ids in ids]
+
+    def retrieve(self, query: str, n_results: int = 10, filters: Optional[AnimeFilters] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns the metadata of the animes most similar to a query, served from the retrieval cache when possible.
+
+        Returns None, not an empty list, when the query could not be embedded or searched.
+        """
+        self.check_index_generation()
+        key = (normalize_query(query), n_results, filters_key(filters))
+        similar_animes = self.retrieval_cache.get(key)
+        if similar_animes is not None:
+            return list(similar_animes)
+
+        query_embedding = self.embed_query(query)
+        if query_embedding is None:
+            logging.error("Failed to generate query embedding.")
+            return None
+
+        generation = self._index_generation
+        logging.info(f"Querying vector store for {n_results} similar animes.")
+        try:
+            with span("search"):
+                similar_animes = self._search(query_embedding[None, :], n_results=n_results, filters=filters)[0]
+        except Exception as e:
+            # An outage is not an empty result: None makes the caller apologize instead of reporting no matches
+            logging.error(f"Vector search failed: {e}", exc_info=True)
+            return None
+        # Skip caching if the index changed while the query was in flight
+        if similar_animes and generation == self._index_generation:
+            self.retrieval_cache.set(key, similar_animes)
+        return list(similar_animes)
+
+    def retrieve_batch(self, queries: List[str], n_results: int = 10, filters: Optional[AnimeFilters] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieves similar animes for many queries at once.
+
+        Queries missing from the caches are encoded in one embedding call and
+        looked up with one multi-embedding vector query. Raises if either step fails.
+
+        Args:
+            queries (List[str]): The user queries.
+            n_results (int): The number of similar animes to fetch per query.
+            filters (Optional[AnimeFilters]): Structured filters applied to every query.
+
+        Returns:
+            List[List[Dict[str, Any]]]: The retrieved metadata of each query, in input order.
+        """
+        self.check_index_generation()
+        keys = [normalize_query(query) for query in queries]
+        retrieved: Dict[str, List[Dict[str, Any]]] = {}
+        for key in dict.fromkeys(keys):
+            similar_animes = self.retrieval_cache.get((key, n_results, filters_key(filters)))
+            if similar_animes is not None:
+                retrieved[key] = similar_animes
+
+        pending = [key for key in dict.fromkeys(keys) if key not in retrieved]
+        if pending:
+            embeddings = {}
+            for key in pending:
+                query_embedding = self.query_cache.get(key)
+                if query_embedding is not None:
+                    embeddings[key] = query_embedding
+            to_encode = [key for key in pending if key not in embeddings]
+            if to_encode:
+                logging.info(f"Generating embeddings for {len(to_encode)} queries.")
+                with span("embed"):
+                    encoded = embedding_model.create_embeddings(to_encode)
+                for key, query_embedding in zip(to_encode, encoded):
+                    self.query_cache.set(key, query_embedding)
+                    embeddings[key] = query_embedding
+
+            generation = self._index_generation
+            logging.info(f"Querying vector store for {n_results} similar animes for {len(pending)} queries.")
+            with span("search"):
+                results = self._search(
+                    np.stack([embeddings[key] for key in pending]),
+                    n_results=n_results,
+                    filters=filters
+                )
+            for key, similar_animes in zip(pending, results):
+                retrieved[key] = similar_animes
+                if similar_animes and generation == self._index_generation:
+                    self.retrieval_cache.set((key, n_results, filters_key(filters)), similar_animes)
+
+        return [list(retrieved[key]) for key in keys]
+
+    @property
+    def neighbor_table(self) -> Optional[NeighborTable]:
+        """
+        The precomputed item-to-item neighbour table, loaded on first use and reloaded after a rebuild.
+        """
+        self.check_index_generation()
+        if self._neighbor_table is None and os.path.exists(config.neighbor_table_path):
+            self._neighbor_table = NeighborTable.load(config.neighbor_table_path)
+        return self._neighbor_table
+
+    def similar_to(self, anime_id: int, n_results: int = 10) -> Optional[Dict[str, Any]]:
+        """
+        Looks up the precomputed neighbours of an anime without any model inference.
+
+        Args:
+            anime_id (int): The anime to find neighbours for.
+            n_results (int): The number of neighbours to return.
+
+        Returns:
+            Optional[Dict[str, Any]]: The anime and its neighbours with similarity scores, or None if the anime is unknown.
+        """
+        table = self.neighbor_table
+        if table is None:
+            logging.error(f"Neighbor table not found at '{config.neighbor_table_path}'. Run the training pipeline first.")
+            return None
+        neighbors = table.lookup(anime_id, n_results=n_results)
+        if neighbors is None:
+            return None
+        return {
+            "anime": table.metadata(anime_id),
+            "source_animes": [dict(metadata, similarity=score) for metadata, score in neighbors],
+        }
+
+    async def amore_like_this(
+        self, anime_id: int, n_results: int = 10, narrate: bool = False, deadline: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns animes similar to `anime_id` from the neighbour table, optionally with an LLM narrative.
+
+        Args:
+            anime_id (int): The anime to find neighbours for.
+            n_results (int): The number of neighbours to return.
+            narrate (bool): Whether to ask the LLM for a recommendation paragraph over the neighbours.
+            deadline (Optional[float]): The request's `request_deadline()`, taken on arrival. Defaults to one from now.
+
+        Returns:
+            Optional[Dict[str, Any]]: The anime, its neighbours and the `llm_response` (None unless narrated), or None if the anime is unknown.
+        """
+        # Loading the table after a rebuild reads every row's metadata, which must not stall the event loop
+        result = await self._run_blocking(self.similar_to, anime_id, n_results, stage="neighbors")
+        if result is None:
+            return None
+        result["llm_response"] = None
+        if narrate and result["source_animes"]:
+            query = f"Anime similar to {result['anime'].get('name', 'this anime')}"
+            try:
+                prompt = self.create_prompt(query=query, context=result["source_animes"])
+                with span("llm"):
+                    result["llm_response"] = await groq_model.agenerate(prompt, deadline=deadline)
+            except Exception as e:
+                result["llm_response"] = self._fallback(query, result["source_animes"], e)["llm_response"]
+        return result
+
+    def _no_context_response(self, similar_animes: Optional[List[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        if similar_animes is None:
+            return {"llm_response": "Sorry, I couldn't process your request at the moment.", "source_animes": [], "degraded": True}
+        if not similar_animes:
+            logging.warning("No similar animes found in the vector store.")
+            return {"llm_response": "I couldn't find any anime matching your description in my database.", "source_animes": [], "degraded": False}
+        return None
+
+    def _fallback(self, query: str, similar_animes: List[Dict[str, Any]], error: Exception) -> Dict[str, Any]:
+        # A deterministic answer from the retrieved animes beats an apology when the LLM is slow or down
+        LLM_EVENTS.inc("fallback")
+        logging.warning(f"Serving a template recommendation for query '{query}' after LLM failure: {error}")
+        return {"llm_response": PROMPT_TEMPLATE.render_fallback(query, similar_animes), "source_animes": similar_animes, "degraded": True}
+
+    def get_recommendation(self, query: str, n_results: int = 10, filters: Optional[AnimeFilters] = None) -> Dict[str, Any]:
         """
         Generates an anime recommendation based on a user query.
+
+        The whole request has `config.llm_deadline_seconds`; when the LLM
+        cannot answer within what is left, a deterministic recommendation is
+        rendered from the retrieved animes instead.
         
         Args:
             query (str): The user's query describing what they want to watch.
             n_results (int): The number of similar animes to fetch for context.
+            filters (Optional[AnimeFilters]): Structured filters applied before the similarity search.
             
         Returns:
-            Dict[str, Any]: A dictionary containing the LLM's response and the source animes.
+            Dict[str, Any]: A dictionary containing the LLM's response, the source animes and
+                whether a template answer was `degraded` in for a failed or late LLM call.
+        """
+        deadline = request_deadline()
+        similar_animes = self.retrieve(query, n_results=n_results, filters=filters)
+        fallback = self._no_context_response(similar_animes)
+        if fallback is not None:
+            return fallback
+
+        logging.info("Requesting recommendation from Groq LLM.")
+        try:
+            prompt = self.create_prompt(query=query, context=similar_animes)
+            with span("llm"):
+                llm_response = groq_model.generate(prompt, deadline=deadline)
+        except Exception as e:
+            return self._fallback(query, similar_animes, e)
+
+        return {"llm_response": llm_response, "source_animes": similar_animes, "degraded": False}
+
+    async def aget_recommendation(
+        self, query: str, n_results: int = 10, filters: Optional[AnimeFilters] = None, deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
-        logging.info(f"Generating embedding for query: '{query}'")
-        query_embedding = EmbeddingModel.get_embeddings(texts=[query])
+        Async variant of `get_recommendation`.
+
+        Embedding and the vector query run on the bounded executor, and the LLM
+        call awaits the async Groq client, so the event loop is never blocked.
         
-        if not query_embedding:
-            logging.error("Failed to generate query embedding.")
-            return {"llm_response": "Sorry, I couldn't process your request at the moment.", "source_animes": []}
+        Args:
+            query (str): The user's query describing what they want to watch.
+            n_results (int): The number of similar animes to fetch for context.
+            filters (Optional[AnimeFilters]): Structured filters applied before the similarity search.
+            deadline (Optional[float]): The request's `request_deadline()`, taken on arrival. Defaults to one from now.
             
-        logging.info(f"Querying vector store for {n_results} similar animes.")
-        similar_animes = VectorStore.query_animes(
-            query_embedding=query_embedding[0],
-            n_results=n_results
-        )
-        
-        if not similar_animes:
-            logging.warning("No similar animes found in the vector store.")
-            return {"llm_response": "I couldn't find any anime matching your description in my database.", "source_animes": []}
+        Returns:
+            Dict[str, Any]: A dictionary containing the LLM's response, the source animes and
+                whether a template answer was `degraded` in for a failed or late LLM call.
+        """
+        deadline = deadline if deadline is not None else request_deadline()
+        similar_animes = await self._run_blocking(self.retrieve, query, n_results, filters)
+        fallback = self._no_context_response(similar_animes)
+        if fallback is not None:
+            return fallback
 
-        logging.info("Creating prompt for the LLM.")
-        prompt = PROMPT_TEMPLATE.create_prompt(query=query, context=similar_animes)
-        
         logging.info("Requesting recommendation from Groq LLM.")
-        llm_response = GroqModel.get_response(prompt=prompt)
+        try:
+            prompt = self.create_prompt(query=query, context=similar_animes)
+            with span("llm"):
+                llm_response = await groq_model.agenerate(prompt, deadline=deadline)
+        except Exception as e:
+            return self._fallback(query, similar_animes, e)
 
-        return {"llm_response": llm_response, "source_animes": similar_animes}
+        return {"llm_response": llm_response, "source_animes": similar_animes, "degraded": False}
 
-# Create a singleton instance
-RECOMMENDER = Recommender()
+    async def astream_recommendation(
+        self, query: str, n_results: int = 10, filters: Optional[AnimeFilters] = None, deadline: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams a recommendation as a sequence of events.
+
+        The retrieved `source_animes` are emitted first, as soon as retrieval
+        finishes, followed by one `token` event per LLM delta and a final `done`
+        event. If the LLM fails or misses the deadline before its first token,
+        a template recommendation is sent as one `token` event instead;
+        failures after that are reported as an `error` event.
 
+        Args:
+            query (str): The user's query describing what they want to watch.
+            n_results (int): The number of similar animes to fetch for context.
+            filters (Optional[AnimeFilters]): Structured filters applied before the similarity search.
+            deadline (Optional[float]): The request's `request_deadline()`, taken on arrival. Defaults to one from now.
+
+        Yields:
+            Dict[str, Any]: Events with an `event` name and a `data` payload.
+        """
+        deadline = deadline if deadline is not None else request_deadline()
+        similar_animes = await self._run_blocking(self.retrieve, query, n_results, filters)
+        fallback = self._no_context_response(similar_animes)
+        if fallback is not None:
+            yield {"event": "source_animes", "data": []}
+            yield {"event": "token", "data": fallback["llm_response"]}
+            yield {"event": "done", "data": None}
+            return
+
+        yield {"event": "source_animes", "data": similar_animes}
+
+        logging.info("Streaming recommendation from Groq LLM.")
+        streamed = False
+        try:
+            prompt = self.create_prompt(query=query, context=similar_animes)
+            with span("llm"):
+                async for delta in groq_model.astream_recommendation(prompt=prompt, deadline=deadline):
+                    streamed = True
+                    yield {"event": "token", "data": delta}
+        except Exception as e:
+            if not streamed:
+                # Nothing was sent yet, so the template answer can stand in for the whole response
+                yield {"event": "token", "data": self._fallback(query, similar_animes, e)["llm_response"]}
+                yield {"event": "done", "data": None}
+                return
+            logging.error(f"Failed to stream recommendation from Groq. Error: {e}")
+            yield {"event": "error", "data": "Sorry, I was unable to generate a recommendation at this time."}
+            return
+        yield {"event": "done", "data": None}
+
+    async def aget_recommendations_batch(
+        self,
+        queries: List[str],
+        n_results: int = 10,
+        filters: Optional[AnimeFilters] = None,
+        deadline: Optional[float] = None,
+        limiter: Optional[ConcurrencyLimiter] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Generates recommendations for many queries in one call.
+
+        Retrieval for the whole batch runs as one embedding call and one vector
+        query on the executor; LLM generations then run concurrently, bounded
+        by `config.batch_llm_concurrency`. With a `limiter`, retrieval and every
+        LLM call each take their own slot, so a batch counts against the same
+        concurrency budget as that many single requests. The batch shares one
+        deadline of `config.llm_deadline_seconds` from its arrival, and an item
+        whose LLM call fails, misses it or gets no slot gets a template
+        recommendation marked `degraded`. A failure only affects its own item.
+
+        Args:
+            queries (List[str]): The user queries.
+            n_results (int): The number of similar animes to fetch per query.
+            filters (Optional[AnimeFilters]): Structured filters applied to every query.
+            deadline (Optional[float]): The batch's `request_deadline()`, taken on arrival. Defaults to one from now.
+            limiter (Optional[ConcurrencyLimiter]): The server's limiter. None runs without taking slots.
+
+        Returns:
+            List[Dict[str, Any]]: One result per query, in input order. An "ok" `status` has an answer, which is
+                `degraded` when it is a template; an "error" `status` has no answer and its `error` says why.
+
+        Raises:
+            OverloadedError: If the limiter has no slot for the retrieval before the deadline.
+        """
+        deadline = deadline if deadline is not None else request_deadline()
+
+        def slot():
+            return limiter.slot(deadline) if limiter is not None else contextlib.nullcontext()
+
+        try:
+            async with slot():
+                retrieved = await self._run_blocking(self.retrieve_batch, queries, n_results, filters)
+        except OverloadedError:
+            raise
+        except Exception as e:
+            logging.error(f"Batch retrieval failed: {e}", exc_info=True)
+            return [
+                {"query": query, "status": "error", "error": "Retrieval failed.", "llm_response": None, "source_animes": [], "degraded": False}
+                for query in queries
+            ]
+
+        semaphore = asyncio.Semaphore(config.batch_llm_concurrency)
+
+        async def generate(query: str, similar_animes: List[Dict[str, Any]]) -> Dict[str, Any]:
+            if not similar_animes:
+                return {
+                    "query": query,
+                    "status": "error",
+                    "error": "No matching anime found.",
+                    "llm_response": None,
+                    "source_animes": [],
+                    "degraded": False,
+                }
+            try:
+                prompt = self.create_prompt(query=query, context=similar_animes)
+                async with semaphore, slot():
+                    with span("llm"):
+                        llm_response = await groq_model.agenerate(prompt, deadline=deadline)
+            except Exception as e:
+                return {"query": query, "status": "ok", "error": None, **self._fallback(query, similar_animes, e)}
+            return {"query": query, "status": "ok", "error": None, "llm_response": llm_response, "source_animes": similar_animes, "degraded": False}
+
+        return await asyncio.gather(*(generate(query, similar) for query, similar in zip(queries, retrieved)))
+
+    async def aclose(self):
+        """
+        Releases the executor and the pooled LLM client.
+        """
+        self.executor.shutdown(wait=False)
+        if self.micro_batcher is not None:
+            self.micro_batcher.close()
+        if groq_model.initialized:
+            await groq_model.aclose()
+
+# Create a singleton instance, built on first use
+RECOMMENDER: Recommender = Lazy(Recommender, "recommender")
+
+def warmup(include_llm: bool = True) -> Dict[str, float]:
+    """
+    Initializes every serving component ahead of the first request.
+
+    Loads the embedding model and runs one encode so the first real query
+    does not pay for model loading, opens the vector store and, unless
+    `include_llm` is False, builds the Groq client.
+
+    Args:
+        include_llm (bool): Whether to also initialize the Groq client.
+
+    Returns:
+        Dict[str, float]: Initialization time in seconds of each component.
+    """
+    components = [embedding_model, VECTOR_STORE, RECOMMENDER]
+    if include_llm:
+        components.append(groq_model)
+    for component in components:
+        component.get()
+    embedding_model.create_embeddings(["warmup"])
+    return {component.name: component.init_seconds for component in components}
+
+def readiness() -> Dict[str, bool]:
+    """
+    Reports which serving components have been initialized.
+    """
+    return {component.name: component.initialized for component in (embedding_model, VECTOR_STORE, RECOMMENDER, groq_model)}
@@ -0,0 +1,59 @@
+import random
+import threading
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when an operation cannot finish before its deadline.
+    """
+
+class LatencyWindow:
+    """
+    Sliding window of recent latencies, used to derive percentile-based delays.
+    """
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        """
+        Initializes the LatencyWindow.
+
+        Args:
+            size (int): The number of most recent samples kept.
+            min_samples (int): The number of samples needed before percentiles are reported.
+        """
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Returns the q-th percentile in seconds, or None while there are too few samples.
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = list(self._samples)
+        return float(np.percentile(samples, q))
+
+def retry_delay(attempt: int, base: float, cap: float = 5.0) -> float:
+    """
+    Exponential backoff with full jitter: a uniform delay in [0, min(cap, base * 2**attempt)].
+    """
+    return random.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Whether an LLM call failure is transient: connection errors, timeouts, 408, 409, 429 and 5xx responses.
+    """
+    import groq
+
+    if isinstance(error, (groq.APIConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
@@ -0,0 +1,89 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from .cache import LRUCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def response_key(model_name: str, prompt: str) -> str:
+    """
+    Returns the cache key of an LLM response: a hash of the model name and the prompt.
+    """
+    return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Two-tier cache of LLM responses keyed on (model name, prompt hash).
+
+    Responses are kept in an in-process LRU with a TTL and, if `db_path` is
+    given, also in a SQLite table so they survive restarts and are shared by
+    every worker on the host.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, db_path: Optional[str] = None):
+        """
+        Initializes the ResponseCache.
+
+        Args:
+            maxsize (int): Maximum number of responses held in memory.
+            ttl (float): Response lifetime in seconds, applied to both tiers.
+            db_path (Optional[str]): Path of the SQLite database. None or empty keeps the cache in memory only.
+        """
+        self.ttl = ttl
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            logger.info(f"LLM response cache persisted to '{db_path}'.")
+
+    def get(self, model_name: str, prompt: str) -> Optional[str]:
+        key = response_key(model_name, prompt)
+        response = self.memory.get(key)
+        if response is not None or self._db is None:
+            return response
+
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        if row is None:
+            return None
+        self.memory.set(key, row[0])
+        return row[0]
+
+    def set(self, model_name: str, prompt: str, response: str):
+        key = response_key(model_name, prompt)
+        self.memory.set(key, response)
+        if self._db is None:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, time.time()),
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to persist LLM response to the cache: {e}")
+
+    def clear(self):
+        self.memory.clear()
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
@@ -0,0 +1,250 @@
+import bisect
+import contextvars
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import config
+
+# Upper bounds in seconds, from sub-millisecond cache hits to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """
+    A monotonically increasing, labelled Prometheus counter.
+    """
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Gauge:
+    """
+    A labelled Prometheus gauge holding the last value set.
+    """
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = float(value)
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram:
+    """
+    A labelled Prometheus histogram with fixed buckets.
+
+    An observation is one bisect and three additions under a lock; cumulative
+    bucket counts are only computed when the metrics are rendered.
+    """
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Holds the process's metrics and renders them in the Prometheus text format.
+    """
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "anime_rec_stage_duration_seconds", "Duration of each recommendation stage.", ["stage"]
+))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "anime_rec_stage_errors_total", "Recommendation stages that raised an exception.", ["stage"]
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "anime_rec_request_duration_seconds", "Duration of HTTP requests until the response starts.", ["method", "route", "status"]
+))
+REQUESTS = REGISTRY.register(Counter(
+    "anime_rec_requests_total", "HTTP requests handled.", ["method", "route", "status"]
+))
+PROMPT_TOKENS = REGISTRY.register(Counter(
+    "anime_rec_prompt_tokens_total", "Estimated tokens of the prompts sent to the LLM."
+))
+PROMPTS = REGISTRY.register(Counter(
+    "anime_rec_prompts_total", "Prompts built for the LLM."
+))
+PROMPT_CONTEXT_ITEMS = REGISTRY.register(Counter(
+    "anime_rec_prompt_context_items_total", "Context animes included in, truncated in or dropped from prompts.", ["outcome"]
+))
+EMBEDDING_BATCH_SIZE = REGISTRY.register(Histogram(
+    "anime_rec_embedding_batch_size", "Texts per micro-batched encode call.", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+))
+EMBEDDING_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "anime_rec_embedding_queue_wait_seconds", "Time a text waits in the micro-batcher before its encode starts."
+))
+CACHE_LOOKUPS = REGISTRY.register(Gauge(
+    "anime_rec_cache_lookups", "Query and retrieval cache lookups since start, by result.", ["cache", "result"]
+))
+CACHE_ENTRIES = REGISTRY.register(Gauge(
+    "anime_rec_cache_entries", "Entries held by the query and retrieval caches.", ["cache"]
+))
+LLM_EVENTS = REGISTRY.register(Counter(
+    "anime_rec_llm_events_total", "LLM call retries, hedges, hedge wins, deadline misses and template fallbacks.", ["event"]
+))
+LIMITER_REQUESTS = REGISTRY.register(Gauge(
+    "anime_rec_limiter_requests", "Requests running or waiting in the concurrency limiter.", ["state"]
+))
+
+class RequestTrace:
+    """
+    The stage timings of one request, identified by its request id.
+    """
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float):
+        self.spans.append((name, seconds))
+
+    def durations(self) -> Dict[str, float]:
+        """
+        Returns the total seconds per stage, summing stages that ran more than once.
+        """
+        totals: Dict[str, float] = {}
+        for name, seconds in self.spans:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def server_timing(self, total_seconds: Optional[float] = None) -> str:
+        """
+        Formats the stage timings as a `Server-Timing` header value in milliseconds.
+        """
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.durations().items()]
+        if total_seconds is not None:
+            entries.append(f"total;dur={total_seconds * 1000:.2f}")
+        return ", ".join(entries)
+
+_CURRENT_TRACE: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("anime_rec_trace", default=None)
+
+def start_trace(request_id: Optional[str] = None) -> Tuple[RequestTrace, contextvars.Token]:
+    """
+    Starts a trace for the current request; spans in this context are recorded on it.
+    """
+    trace = RequestTrace(request_id or uuid.uuid4().hex)
+    return trace, _CURRENT_TRACE.set(trace)
+
+def end_trace(token: contextvars.Token):
+    _CURRENT_TRACE.reset(token)
+
+def current_trace() -> Optional[RequestTrace]:
+    return _CURRENT_TRACE.get()
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(seconds, self.name)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(self.name)
+        trace = _CURRENT_TRACE.get()
+        if trace is not None:
+            trace.add(self.name, seconds)
+        return False
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+def span(name: str):
+    """
+    Times a block as the stage `name`.
+
+    The duration feeds the stage histogram and, inside a request, the request's
+    trace. With `config.telemetry_enabled` off this returns a shared no-op.
+
+    Args:
+        name (str): The stage name, used as the metric label and Server-Timing entry.
+    """
+    return _Span(name) if config.telemetry_enabled else _NOOP_SPAN
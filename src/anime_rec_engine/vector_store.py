@@ -1,24 +1,202 @@
-import chromadb
 import logging
-from typing import List
-from .data_models import Anime
-from .llm_models import embedding_model
+import math
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+from .config import config
+from .data_models import Anime, AnimeFilters
+from .lazy import Lazy
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-class VectorStore:
+class VectorStore(ABC):
+    """
+    Interface shared by the vector store backends for anime embeddings.
+
+    Backends store one vector plus a flat metadata dict per anime, keyed by
+    `anime_id`, and answer nearest-neighbour queries with that metadata.
+    """
+    def __init__(self):
+        self._change_listeners: List[Callable[[], None]] = []
+
+    def add_change_listener(self, callback: Callable[[], None]):
+        """
+        Registers a callback that is invoked whenever the indexed data changes.
+
+        Query-side caches use this to drop results that a re-index made stale.
+
+        Args:
+            callback (Callable[[], None]): The function to call after every write.
+        """
+        self._change_listeners.append(callback)
+
+    def _notify_change(self):
+        for callback in self._change_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Vector store change listener failed: {e}", exc_info=True)
+
+    def _to_records(self, animes: List[Anime], embeddings: np.ndarray):
+        if len(embeddings) != len(animes):
+            raise ValueError(f"Got {len(embeddings)} embeddings for {len(animes)} animes.")
+
+        ids = [str(anime.anime_id) for anime in animes]
+        metadatas = []
+        for anime in animes:
+            data = anime.dict()
+            # Convert list fields to string format acceptable by ChromaDB
+            if isinstance(data.get('genre'), list):
+                data['genre'] = ', '.join(data['genre'])
+            metadatas.append(data)
+        return ids, metadatas
+
+    @abstractmethod
+    def recreate_collection(self):
+        """
+        Drops all stored vectors and starts from an empty index.
+        """
+
+    @abstractmethod
+    def add_animes(self, animes: List[Anime], embeddings: np.ndarray):
+        """
+        Adds a batch of animes and their embedding matrix.
+        """
+
+    @abstractmethod
+    def upsert_animes(self, animes: List[Anime], embeddings: np.ndarray):
+        """
+        Inserts new animes and overwrites existing ones with the same `anime_id`.
+        """
+
+    @abstractmethod
+    def delete_animes(self, anime_ids: List[int]):
+        """
+        Removes the given animes.
+        """
+
+    @abstractmethod
+    def count(self) -> int:
+        """
+        Returns the number of stored vectors.
+        """
+
+    @abstractmethod
+    def find_similar_animes(self, query_embedding: np.ndarray, n_results: int = 10, filters: Optional[AnimeFilters] = None) -> List[dict]:
+        """
+        Returns the metadata of the `n_results` animes nearest to a query embedding.
+
+        Only animes matching `filters` are considered; the filter is applied
+        before the similarity search, not to its results.
+        """
+
+    @abstractmethod
+    def find_similar_animes_batch(self, query_embeddings: np.ndarray, n_results: int = 10, filters: Optional[AnimeFilters] = None) -> List[List[dict]]:
+        """
+        Returns the nearest-neighbour metadata of several query embeddings, in input order.
+        """
+
+    @abstractmethod
+    def find_similar_ids_batch(self, query_embeddings: np.ndarray, n_results: int = 10, filters: Optional[AnimeFilters] = None) -> List[List[int]]:
+        """
+        Returns only the `anime_id`s of the nearest neighbours of several query embeddings, in input order.
+
+        Callers that hold the catalog use this to skip fetching metadata from the store.
+        """
+
+    @abstractmethod
+    def export(self) -> Tuple[np.ndarray, np.ndarray, List[dict]]:
+        """
+        Returns every stored anime as (int64 ids, float32 embedding matrix, metadata list), row-aligned.
+        """
+
+    def persist(self, checkpoint: bool = False):
+        """
+        Flushes the index to durable storage. Backends that write through do nothing.
+
+        Args:
+            checkpoint (bool): Whether this is a mid-ingest checkpoint. Checkpoints go to a
+                side location that serving processes do not read, and the final persist publishes.
+        """
+
+    def reload(self):
+        """
+        Picks up an index that another process rewrote since this store opened it.
+        """
+
+    def restore_checkpoint(self) -> bool:
+        """
+        Loads the index saved by the last checkpoint of an interrupted ingest, if there is one.
+
+        Returns:
+            bool: Whether a checkpoint was restored. Backends that write through always return False.
+        """
+        return False
+
+# Chroma cannot filter on substrings of metadata values, so each genre is also stored as its own boolean key
+GENRE_FLAG_PREFIX = "has_genre:"
+# Headroom over the over-fetch expected from genre frequencies, since excluded genres cluster among similar animes
+EXCLUDE_MARGIN = 1.25
+
+def _genres_of(metadata: dict) -> set:
+    return {genre.strip() for genre in str(metadata.get("genre", "")).split(",") if genre.strip()}
+
+def build_chroma_where(filters: Optional[AnimeFilters]) -> Optional[dict]:
+    """
+    Translates structured filters into a Chroma `where` clause.
+
+    Excluded genres are left out: flags are only written for genres a record
+    has, and Chroma never matches `$ne` on a missing key, so they are filtered
+    after the query instead.
+
+    Args:
+        filters (Optional[AnimeFilters]): The filters to translate.
+
+    Returns:
+        Optional[dict]: The `where` clause, or None when nothing is filtered.
+    """
+    if filters is None or filters.is_empty():
+        return None
+    conditions = []
+    if filters.types:
+        conditions.append({"type": {"$in": list(filters.types)}})
+    if filters.min_rating is not None:
+        conditions.append({"rating": {"$gte": filters.min_rating}})
+    if filters.max_rating is not None:
+        conditions.append({"rating": {"$lte": filters.max_rating}})
+    if filters.min_members is not None:
+        conditions.append({"members": {"$gte": filters.min_members}})
+    if filters.max_members is not None:
+        conditions.append({"members": {"$lte": filters.max_members}})
+    for genre in filters.include_genres or []:
+        conditions.append({f"{GENRE_FLAG_PREFIX}{genre}": {"$eq": True}})
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+class ChromaVectorStore(VectorStore):
     """
     Manages the ChromaDB vector store for anime embeddings.
+
+    Structured filters are pushed down into Chroma as a `where` clause.
+    Included genres rely on per-genre flag keys written with each record;
+    excluded genres are dropped in Python from a result over-fetched by how
+    common those genres are. The counts are cached until the next write.
     """
     def __init__(self, path: str = "./chroma_db", collection_name: str = "anime_recommendations"):
         """
         Initializes the VectorStore client and collection.
         """
+        super().__init__()
         try:
+            import chromadb
             self.client = chromadb.PersistentClient(path=path)
             self.collection_name = collection_name  # <-- Store collection_name as instance attribute
             self.collection = self.client.get_or_create_collection(name=collection_name)
+            # Only change on writes, so they are cached until the next change notification
+            self._count: Optional[int] = None
+            self._genre_counts: Dict[str, int] = {}
             logger.info(f"ChromaDB client initialized at path '{path}' and collection '{collection_name}' is ready.")
         except Exception as e:
             logger.error(f"Failed to initialize ChromaDB. Error: {e}")
@@ -38,24 +216,79 @@ class VectorStore:
             logger.error(f"An error occurred while trying to delete collection: {e}", exc_info=True)
         
         self.collection = self.client.get_or_create_collection(name=self.collection_name)
+        self._notify_change()
         logger.info(f"Collection '{self.collection_name}' is now ready for data population.")
 
-    def add_animes(self, animes: List[Anime], embeddings: List[List[float]]):
-        if not animes or not embeddings:
-            logger.warning("add_animes called with empty animes or embeddings list.")
-            return
+    def reload(self):
+        # A rebuild in another process deletes the collection this handle points at and creates a new one
+        self.collection = self.client.get_or_create_collection(name=self.collection_name)
+        self._notify_change()
+        logger.info(f"Collection '{self.collection_name}' re-opened after an index rebuild.")
 
-        ids = [str(anime.anime_id) for anime in animes]
-        metadatas = []
-        for anime in animes:
-            data = anime.dict()
-            # Convert list fields to string format acceptable by ChromaDB
-            if isinstance(data.get('genre'), list):
-                data['genre'] = ', '.join(data['genre'])
-            metadatas.append(data)
+    def _notify_change(self):
+        self._count = None
+        self._genre_counts = {}
+        super()._notify_change()
+
+    def _genre_count(self, genre: str) -> int:
+        count = self._genre_counts.get(genre)
+        if count is None:
+            matches = self.collection.get(where={f"{GENRE_FLAG_PREFIX}{genre}": {"$eq": True}}, include=[])
+            count = self._genre_counts[genre] = len(matches["ids"])
+        return count
+
+    def _to_records(self, animes: List[Anime], embeddings: np.ndarray):
+        ids, metadatas = super()._to_records(animes, embeddings)
+        for anime, metadata in zip(animes, metadatas):
+            for genre in anime.genre:
+                metadata[f"{GENRE_FLAG_PREFIX}{genre}"] = True
+        return ids, metadatas
+
+    @staticmethod
+    def _strip_flags(metadatas: List[dict]) -> List[dict]:
+        return [
+            {key: value for key, value in metadata.items() if not key.startswith(GENRE_FLAG_PREFIX)}
+            for metadata in metadatas
+        ]
+
+    def _query(self, query_embeddings, n_results: int, filters: Optional[AnimeFilters], include: List[str]) -> Tuple[List[List[str]], List[List[dict]]]:
+        # Returns the ids and metadatas of each query, with excluded genres filtered out
+        where = build_chroma_where(filters)
+        excluded = set(filters.exclude_genres or []) if filters is not None else set()
+        if not excluded:
+            results = self.collection.query(query_embeddings=query_embeddings, n_results=n_results, where=where, include=include)
+            return results["ids"], results.get("metadatas") or [[] for _ in results["ids"]]
+
+        # Size the fetch by the share of records the exclusion keeps, then grow it until
+        # every query keeps n_results or the matches run out
+        total = self.count()
+        kept_share = 1.0 - min(total, sum(self._genre_count(genre) for genre in excluded)) / total if total else 1.0
+        fetch = min(total, math.ceil(n_results * EXCLUDE_MARGIN / kept_share)) if kept_share > 0 else total
+        while True:
+            results = self.collection.query(query_embeddings=query_embeddings, n_results=max(fetch, 1), where=where, include=["metadatas"])
+            ids, metadatas, short = [], [], False
+            for query_ids, query_metadatas in zip(results["ids"], results["metadatas"]):
+                kept = [(anime_id, metadata) for anime_id, metadata in zip(query_ids, query_metadatas) if not excluded & _genres_of(metadata)]
+                short = short or (len(kept) < n_results and len(query_ids) == fetch)
+                ids.append([anime_id for anime_id, _ in kept[:n_results]])
+                metadatas.append([metadata for _, metadata in kept[:n_results]])
+            if not short or fetch >= total:
+                return ids, metadatas
+            fetch = min(total, fetch * 2)
 
+    def add_animes(self, animes: List[Anime], embeddings: np.ndarray):
+        """
+        Adds a batch of animes and their embedding matrix to the collection.
 
+        Args:
+            animes (List[Anime]): The animes to add.
+            embeddings (np.ndarray): A float32 matrix with one row per anime.
+        """
+        if not animes or embeddings is None or len(embeddings) == 0:
+            logger.warning("add_animes called with empty animes or embeddings.")
+            return
 
+        ids, metadatas = self._to_records(animes, embeddings)
         try:
             self.collection.add(
                 ids=ids,
@@ -65,21 +298,128 @@ class VectorStore:
         except Exception as e:
             logger.error(f"Failed to add batch to ChromaDB: {e}", exc_info=True)
             raise
+        finally:
+            self._notify_change()
+
+    def upsert_animes(self, animes: List[Anime], embeddings: np.ndarray):
+        """
+        Inserts new animes and overwrites existing ones with the same `anime_id`.
+
+        Args:
+            animes (List[Anime]): The animes to write.
+            embeddings (np.ndarray): A float32 matrix with one row per anime.
+        """
+        if not animes or embeddings is None or len(embeddings) == 0:
+            logger.warning("upsert_animes called with empty animes or embeddings.")
+            return
+
+        ids, metadatas = self._to_records(animes, embeddings)
+        try:
+            self.collection.upsert(
+                ids=ids,
+                embeddings=embeddings,
+                metadatas=metadatas
+            )
+        except Exception as e:
+            logger.error(f"Failed to upsert batch to ChromaDB: {e}", exc_info=True)
+            raise
+        finally:
+            self._notify_change()
+
+    def delete_animes(self, anime_ids: List[int]):
+        """
+        Removes the given animes from the collection.
+
+        Args:
+            anime_ids (List[int]): The ids of the animes to remove.
+        """
+        if not anime_ids:
+            return
+        try:
+            self.collection.delete(ids=[str(anime_id) for anime_id in anime_ids])
+        except Exception as e:
+            logger.error(f"Failed to delete animes from ChromaDB: {e}", exc_info=True)
+            raise
+        finally:
+            self._notify_change()
+
+    def count(self) -> int:
+        """
+        Returns the number of vectors currently stored in the collection.
+        """
+        if self._count is None:
+            self._count = self.collection.count()
+        return self._count
+
+    def find_similar_ids_batch(self, query_embeddings: np.ndarray, n_results: int = 10, filters: Optional[AnimeFilters] = None) -> List[List[int]]:
+        if query_embeddings is None or len(query_embeddings) == 0:
+            return []
+        try:
+            ids, _ = self._query(query_embeddings, n_results, filters, include=["distances"])
+            return [[int(anime_id) for anime_id in query_ids] for query_ids in ids]
+        except Exception as e:
+            logger.error(f"Failed to run id query against ChromaDB: {e}", exc_info=True)
+            raise
+
+    def export(self) -> Tuple[np.ndarray, np.ndarray, List[dict]]:
+        try:
+            results = self.collection.get(include=["embeddings", "metadatas"])
+        except Exception as e:
+            logger.error(f"Failed to export ChromaDB collection: {e}", exc_info=True)
+            raise
+        ids = np.array([int(anime_id) for anime_id in results["ids"]], dtype=np.int64)
+        embeddings = np.asarray(results["embeddings"], dtype=np.float32)
+        return ids, embeddings.reshape(len(ids), -1), self._strip_flags(results["metadatas"])
 
-    def find_similar_animes(self, query_embedding: List[float], n_results: int = 10) -> List[dict]:
-        if not query_embedding:
+    def find_similar_animes(self, query_embedding: np.ndarray, n_results: int = 10, filters: Optional[AnimeFilters] = None) -> List[dict]:
+        if query_embedding is None or len(query_embedding) == 0:
             logger.error("find_similar_animes called with an empty query_embedding.")
             return []
             
         try:
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results
-            )
-            return results.get('metadatas', [[]])[0]
+            _, metadatas = self._query([query_embedding], n_results, filters, include=["metadatas"])
+            return self._strip_flags(metadatas[0])
         except Exception as e:
             logger.error(f"Failed to query ChromaDB: {e}", exc_info=True)
             return []
 
-# Singleton instance to be used across the application
-VECTOR_STORE = VectorStore()
+    def find_similar_animes_batch(self, query_embeddings: np.ndarray, n_results: int = 10, filters: Optional[AnimeFilters] = None) -> List[List[dict]]:
+        """
+        Retrieves neighbours for several query embeddings with a single collection query.
+
+        Args:
+            query_embeddings (np.ndarray): A float32 matrix with one row per query.
+            n_results (int): The number of neighbours to return per query.
+            filters (Optional[AnimeFilters]): Filters applied to every query.
+
+        Returns:
+            List[List[dict]]: The neighbour metadata of each query, in input order.
+        """
+        if query_embeddings is None or len(query_embeddings) == 0:
+            return []
+        try:
+            _, metadatas = self._query(query_embeddings, n_results, filters, include=["metadatas"])
+            return [self._strip_flags(query_metadatas) for query_metadatas in metadatas]
+        except Exception as e:
+            logger.error(f"Failed to run batch query against ChromaDB: {e}", exc_info=True)
+            raise
+
+def create_vector_store(backend: str = config.vector_store_backend) -> VectorStore:
+    """
+    Builds the vector store backend selected by name.
+
+    Args:
+        backend (str): Either "chroma" or "numpy".
+
+    Returns:
+        VectorStore: The configured backend instance.
+    """
+    if backend == "chroma":
+        return ChromaVectorStore(path=config.chroma_db_path)
+    if backend == "numpy":
+        from .numpy_vector_store import NumpyVectorStore
+        return NumpyVectorStore(path=config.numpy_index_path, mmap=config.numpy_index_mmap)
+    raise ValueError(f"Unknown vector store backend '{backend}'. Expected 'chroma' or 'numpy'.")
+
+# Singleton instance to be used across the application, opened on first use
+VECTOR_STORE: VectorStore = Lazy(create_vector_store, "vector store")
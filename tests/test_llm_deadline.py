@@ -0,0 +1,100 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from anime_rec_engine.cache import AsyncSingleFlight, SingleFlight
+from anime_rec_engine.config import config
+from anime_rec_engine.llm_models import GroqModel
+from anime_rec_engine.resilience import DeadlineExceeded, LatencyWindow
+
+def completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+def make_model():
+    # Skips __init__, so no API key or network client is needed
+    model = GroqModel.__new__(GroqModel)
+    model.model_name = "test-model"
+    model.latencies = LatencyWindow()
+    model.response_cache = None
+    model._single_flight = SingleFlight()
+    model._async_single_flight = AsyncSingleFlight()
+    return model
+
+def fake_calls(model, delays):
+    """
+    Replaces the async LLM call: the n-th call sleeps `delays[n]` and answers "call n".
+    Returns the list of (call number, outcome) records.
+    """
+    calls = []
+
+    async def acall(prompt, remaining):
+        number = len(calls)
+        calls.append([number, "running"])
+        try:
+            await asyncio.sleep(delays[number])
+        except asyncio.CancelledError:
+            calls[number][1] = "cancelled"
+            raise
+        calls[number][1] = "done"
+        return completion(f"call {number}")
+
+    model._acall = acall
+    return calls
+
+@pytest.fixture
+def llm_config(monkeypatch):
+    monkeypatch.setattr(config, "llm_hedge_enabled", True)
+    monkeypatch.setattr(config, "llm_hedge_initial_delay", 0.05)
+    monkeypatch.setattr(config, "llm_min_attempt_seconds", 0.05)
+    monkeypatch.setattr(config, "llm_max_retries", 0)
+
+def test_slow_call_is_hedged_and_the_hedge_wins(llm_config):
+    model = make_model()
+    calls = fake_calls(model, [1.0, 0.01])
+
+    assert asyncio.run(model.agenerate("prompt", deadline=time.monotonic() + 2.0)) == "call 1"
+    assert calls == [[0, "cancelled"], [1, "done"]]
+
+def test_fast_call_is_not_hedged(llm_config):
+    model = make_model()
+    calls = fake_calls(model, [0.01, 0.01])
+
+    assert asyncio.run(model.agenerate("prompt", deadline=time.monotonic() + 2.0)) == "call 0"
+    assert calls == [[0, "done"]]
+
+def test_async_call_gives_up_at_the_deadline(llm_config, monkeypatch):
+    monkeypatch.setattr(config, "llm_hedge_enabled", False)
+    model = make_model()
+    calls = fake_calls(model, [5.0])
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(model.agenerate("prompt", deadline=time.monotonic() + 0.3))
+    assert time.monotonic() - started < 1.0
+    assert calls == [[0, "cancelled"]]
+
+def test_no_call_starts_without_enough_time_left(llm_config):
+    model = make_model()
+    calls = fake_calls(model, [0.01])
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(model.agenerate("prompt", deadline=time.monotonic() + 0.01))
+    assert calls == []
+
+def test_sync_call_gives_up_at_the_deadline(llm_config):
+    model = make_model()
+    model.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        create=lambda **kwargs: time.sleep(2.0) or completion("late")
+    )))
+    model._sync_executor = ThreadPoolExecutor(max_workers=1)
+
+    started = time.monotonic()
+    try:
+        with pytest.raises(DeadlineExceeded):
+            model.generate("prompt", deadline=time.monotonic() + 0.3)
+        assert time.monotonic() - started < 1.0
+    finally:
+        model._sync_executor.shutdown(wait=False)
@@ -0,0 +1,134 @@
+import json
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anime_rec_engine import pipeline
+from anime_rec_engine.config import config
+from anime_rec_engine.numpy_vector_store import NumpyVectorStore
+
+BATCH_SIZE = 5
+ROWS = 40
+
+class Interrupted(BaseException):
+    """
+    Stands in for the process being killed mid-ingest.
+    """
+
+class FakeEmbeddingModel:
+    """
+    Deterministic embeddings from a hash of each text.
+    """
+    cache = None
+    pool = None
+
+    def __init__(self):
+        self.calls = 0
+        self.texts = 0
+
+    def start_pool(self, num_workers):
+        pass
+
+    def stop_pool(self):
+        pass
+
+    def create_embeddings(self, texts, use_cache=True):
+        self.calls += 1
+        self.texts += len(texts)
+        return np.stack([
+            np.random.default_rng(zlib.crc32(text.encode("utf-8"))).normal(size=8).astype(np.float32) for text in texts
+        ])
+
+class InterruptedStore(NumpyVectorStore):
+    """
+    Numpy store whose n-th write is interrupted. Writes run on the pipeline's calling thread, so this is deterministic.
+    """
+    def __init__(self, path, interrupt_on_write):
+        super().__init__(path)
+        self.interrupt_on_write = interrupt_on_write
+        self.writes = 0
+
+    def upsert_animes(self, animes, embeddings):
+        self.writes += 1
+        if self.writes == self.interrupt_on_write:
+            raise Interrupted()
+        super().upsert_animes(animes, embeddings)
+
+def write_catalog(path, anime_ids, renamed=()):
+    pd.DataFrame([
+        {
+            "anime_id": anime_id,
+            "name": f"Anime {anime_id}{' (renamed)' if anime_id in renamed else ''}",
+            "genre": "Action, Drama" if anime_id % 2 else "Comedy",
+            "type": "TV",
+            "episodes": 12,
+            "rating": 7.5,
+            "members": 1000 + anime_id,
+        }
+        for anime_id in anime_ids
+    ]).to_csv(path, index=False)
+    return str(path)
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ingest_checkpoint_path", str(tmp_path / "ingest_checkpoint.json"))
+    monkeypatch.setattr(config, "ingest_checkpoint_every", 1)
+    monkeypatch.setattr(config, "index_manifest_path", str(tmp_path / "index_manifest.json"))
+    monkeypatch.setattr(config, "catalog_path", str(tmp_path / "catalog.bin"))
+    monkeypatch.setattr(config, "quantized_index_dir", str(tmp_path / "quantized_index"))
+    monkeypatch.setattr(config, "quantized_recall_queries", 0)
+    return tmp_path
+
+def start_process(monkeypatch, workdir, model, interrupt_on_write=None):
+    # A fresh store instance only sees what earlier runs wrote to disk, like a new process
+    store = InterruptedStore(str(workdir / "index.bin"), interrupt_on_write)
+    monkeypatch.setattr(pipeline, "VECTOR_STORE", store)
+    monkeypatch.setattr(pipeline, "embedding_model", model)
+    return store
+
+def run(data_filepath, incremental=False):
+    return pipeline.run_training_pipeline(
+        data_filepath, batch_size=BATCH_SIZE, incremental=incremental, build_neighbors=False, reject_report_path="", encode_workers=1
+    )
+
+def test_resume_after_interrupt_writes_every_row_once(workdir, monkeypatch):
+    data_filepath = write_catalog(workdir / "anime.csv", range(1, ROWS + 1))
+
+    start_process(monkeypatch, workdir, FakeEmbeddingModel(), interrupt_on_write=6)
+    with pytest.raises(Interrupted):
+        run(data_filepath)
+    with open(config.ingest_checkpoint_path, encoding="utf-8") as f:
+        completed = json.load(f)["completed"]
+    assert 0 < len(completed) < ROWS // BATCH_SIZE
+    # The half-built index never reaches the path serving processes load
+    assert not os.path.exists(workdir / "index.bin")
+
+    model = FakeEmbeddingModel()
+    store = start_process(monkeypatch, workdir, model)
+    stats = run(data_filepath)
+
+    ids = store.export()[0].tolist()
+    assert sorted(ids) == list(range(1, ROWS + 1))
+    assert stats["resumed"] == BATCH_SIZE * len(completed)
+    assert stats["added"] == ROWS - stats["resumed"]
+    assert model.calls == ROWS // BATCH_SIZE - len(completed)
+    assert not os.path.exists(config.ingest_checkpoint_path)
+    assert not os.path.exists(store.checkpoint_path)
+
+def test_incremental_run_applies_only_the_diff(workdir, monkeypatch):
+    start_process(monkeypatch, workdir, FakeEmbeddingModel())
+    run(write_catalog(workdir / "anime.csv", range(1, ROWS + 1)))
+
+    anime_ids = [anime_id for anime_id in range(1, ROWS + 4) if anime_id not in (10, 11)]
+    data_filepath = write_catalog(workdir / "anime_v2.csv", anime_ids, renamed=(3,))
+    model = FakeEmbeddingModel()
+    store = start_process(monkeypatch, workdir, model)
+    stats = run(data_filepath, incremental=True)
+
+    assert (stats["added"], stats["updated"], stats["deleted"]) == (3, 1, 2)
+    assert stats["unchanged"] == ROWS - 3
+    assert model.texts == 4
+    assert sorted(store.export()[0].tolist()) == sorted(anime_ids)